@@ -0,0 +1,404 @@
+import fcntl
+import glob
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from backend.db import get_submissions_since
+
+# Columnar copy of quiz_attempts x quizzes x users for analysts.
+# Layout: <SNAPSHOT_DIR>/month=YYYY-MM/part-<last answered_at, us>-<n>.parquet
+# (zstd). Parts are written under a hidden temporary name and renamed into
+# place, so readers never see a partial file, and the rename is what advances
+# the export watermark. answered_at is stamped at insert, not at commit, so
+# re-runs read again from EXPORT_OVERLAP before the watermark and skip attempt
+# ids already in the snapshot; late commits and rows sharing the watermark's
+# microsecond are picked up instead of lost. Once a month holds more than
+# COMPACT_PARTS parts it is rewritten into one part; readers hold a shared lock
+# on _read.lock so they never see the old and new parts side by side.
+# _state.json only records when the last export ran.
+SNAPSHOT_DIR = os.getenv("LERNA_SNAPSHOT_DIR", "data/snapshots/attempts")
+STATE_FILE = "_state.json"
+FLUSH_ROWS = 50_000
+EXPORT_OVERLAP = timedelta(seconds=int(os.getenv("LERNA_EXPORT_OVERLAP_SECONDS", "300")))
+COMPACT_PARTS = int(os.getenv("LERNA_SNAPSHOT_COMPACT_PARTS", "16"))
+
+ATTEMPT_SCHEMA = pa.schema([
+    ("attempt_id", pa.string()),
+    ("user_id", pa.string()),
+    ("quiz_id", pa.string()),
+    ("answer", pa.string()),
+    ("is_correct", pa.bool_()),
+    ("answered_at", pa.timestamp("us", tz="UTC")),
+    ("week", pa.date32()),
+    ("sop_topic", pa.string()),
+    ("question", pa.string()),
+    ("difficulty", pa.string()),
+    ("user_name", pa.string()),
+    ("store_id", pa.string()),
+])
+
+
+def parse_timestamp(value: str) -> datetime:
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def flatten_attempt(row: dict) -> dict:
+    quiz = row.get("quizzes") or {}
+    user = row.get("users") or {}
+    answered_at = parse_timestamp(row["answered_at"])
+    store_id = user.get("store_id")
+    return {
+        "attempt_id": str(row["id"]),
+        "user_id": row.get("user_id"),
+        "quiz_id": None if row.get("quiz_id") is None else str(row["quiz_id"]),
+        "answer": row.get("answer"),
+        "is_correct": bool(row.get("is_correct")),
+        "answered_at": answered_at,
+        "week": answered_at.date() - timedelta(days=answered_at.weekday()),
+        "sop_topic": quiz.get("sop_topic"),
+        "question": quiz.get("question"),
+        "difficulty": quiz.get("difficulty"),
+        "user_name": user.get("name"),
+        "store_id": None if store_id is None else str(store_id),
+    }
+
+
+def read_state(snapshot_dir: str = SNAPSHOT_DIR) -> dict:
+    path = os.path.join(snapshot_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_state(snapshot_dir: str, state: dict):
+    path = os.path.join(snapshot_dir, STATE_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _epoch_us(ts: datetime) -> int:
+    return (ts - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+
+
+def write_partitioned(rows: list, snapshot_dir: str = SNAPSHOT_DIR, prefix: str = "part",
+                      name: str = None):
+    """
+    Write flattened attempt rows (in answered_at order) as one zstd parquet file
+    per month partition, oldest month first. Each file is named after its last
+    answered_at plus a unique suffix, unless a fixed `name` is given, in which
+    case an existing file is replaced (idempotent re-runs).
+    """
+    by_month = {}
+    for r in rows:
+        by_month.setdefault(r["answered_at"].strftime("%Y-%m"), []).append(r)
+
+    stamp = time.time_ns()
+    for month, month_rows in by_month.items():
+        part_dir = os.path.join(snapshot_dir, f"month={month}")
+        os.makedirs(part_dir, exist_ok=True)
+        stem = name or f"{prefix}-{_epoch_us(month_rows[-1]['answered_at'])}-{stamp}"
+        filename = f"{stem}.parquet"
+        # Dot-prefixed files are ignored by pyarrow datasets
+        tmp = os.path.join(part_dir, f".{filename}.{os.getpid()}.tmp")
+        table = pa.Table.from_pylist(month_rows, schema=ATTEMPT_SCHEMA)
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, os.path.join(part_dir, filename))
+
+
+@contextmanager
+def _read_lock(snapshot_dir: str, exclusive: bool = False):
+    with open(os.path.join(snapshot_dir, "_read.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def _part_watermark(path: str) -> int:
+    stem = os.path.basename(path)[len("part-"):-len(".parquet")].split("-")[0]
+    return int(stem) if stem.isdigit() else None
+
+
+def _finish_compaction(part_dir: str):
+    # A compaction that died after renaming its output still has to remove the
+    # parts it replaced; one that died before that is simply dropped.
+    for manifest in glob.glob(os.path.join(part_dir, ".compact-*.json")):
+        with open(manifest) as f:
+            plan = json.load(f)
+        if os.path.exists(os.path.join(part_dir, plan["output"])):
+            for name in plan["inputs"]:
+                if os.path.exists(os.path.join(part_dir, name)):
+                    os.remove(os.path.join(part_dir, name))
+        os.remove(manifest)
+
+
+def compact_month(part_dir: str, min_parts: int = COMPACT_PARTS) -> bool:
+    """
+    Rewrite a month partition with more than `min_parts` parts into a single
+    part named after the newest of them, so the watermark is unchanged.
+    Call with the export lock held.
+    """
+    _finish_compaction(part_dir)
+    parts = sorted(glob.glob(os.path.join(part_dir, "part-*.parquet")))
+    if len(parts) <= min_parts:
+        return False
+
+    table = pa.concat_tables([pq.read_table(p, schema=ATTEMPT_SCHEMA) for p in parts])
+    table = table.sort_by([("answered_at", "ascending")])
+    newest = max(w for w in map(_part_watermark, parts) if w is not None)
+    output = f"part-{newest}-{time.time_ns()}.parquet"
+    tmp = os.path.join(part_dir, f".{output}.{os.getpid()}.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+
+    manifest = os.path.join(part_dir, f".compact-{time.time_ns()}.json")
+    with open(manifest, "w") as f:
+        json.dump({"output": output, "inputs": [os.path.basename(p) for p in parts]}, f)
+    with _read_lock(os.path.dirname(part_dir), exclusive=True):
+        os.replace(tmp, os.path.join(part_dir, output))
+        _finish_compaction(part_dir)
+    return True
+
+
+def snapshot_watermark(snapshot_dir: str = SNAPSHOT_DIR):
+    """
+    answered_at of the newest exported attempt (None for an empty snapshot),
+    read from the part file names.
+    """
+    newest = None
+    for part in glob.glob(os.path.join(snapshot_dir, "month=*", "part-*.parquet")):
+        watermark = _part_watermark(part)
+        if watermark is not None:
+            newest = max(newest or 0, watermark)
+    if newest is None:
+        return None
+    return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=newest)
+
+
+def export_snapshot(snapshot_dir: str = SNAPSHOT_DIR) -> int:
+    """
+    Append attempts answered after the snapshot watermark to the snapshot.
+    Returns the number of exported rows.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    # Several API workers (and cron jobs) may export at once; only one may append
+    with open(os.path.join(snapshot_dir, "_export.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return _export_locked(snapshot_dir)
+
+
+def _export_locked(snapshot_dir: str) -> int:
+    # Leftovers of an export that died mid-write; their rows are not covered
+    # by the watermark and get exported again.
+    for tmp in glob.glob(os.path.join(snapshot_dir, "month=*", ".*.tmp")):
+        os.remove(tmp)
+    for part_dir in glob.glob(os.path.join(snapshot_dir, "month=*")):
+        _finish_compaction(part_dir)
+
+    last = snapshot_watermark(snapshot_dir)
+    since = last - EXPORT_OVERLAP if last else None
+    exported_ids = set()
+    if since:
+        exported_ids = set(load_attempts(["attempt_id"], start=since,
+                                         snapshot_dir=snapshot_dir)["attempt_id"].to_pylist())
+    exported = 0
+    buffer = []
+    months = set()
+    for row in get_submissions_since(since.isoformat() if since else None):
+        if str(row["id"]) in exported_ids:
+            continue
+        buffer.append(flatten_attempt(row))
+        months.add(buffer[-1]["answered_at"].strftime("%Y-%m"))
+        if len(buffer) >= FLUSH_ROWS:
+            write_partitioned(buffer, snapshot_dir)
+            exported += len(buffer)
+            buffer = []
+
+    if buffer:
+        write_partitioned(buffer, snapshot_dir)
+        exported += len(buffer)
+    for month in sorted(months):
+        compact_month(os.path.join(snapshot_dir, f"month={month}"))
+    state = read_state(snapshot_dir)
+    last = snapshot_watermark(snapshot_dir)
+    state["last_answered_at"] = last.isoformat() if last else None
+    state["exported_at"] = datetime.now(timezone.utc).isoformat()
+    _write_state(snapshot_dir, state)
+    print(f"Exported {exported} attempts to {snapshot_dir}")
+    return exported
+
+
+def load_attempts(columns: list = None, start: datetime = None, end: datetime = None,
+                  snapshot_dir: str = SNAPSHOT_DIR) -> pa.Table:
+    """
+    Read the snapshot as an Arrow table, optionally limited to
+    [start, end) on answered_at (tz-aware UTC datetimes). Month partitions
+    outside the range are skipped. Files are memory-mapped, but zstd pages are
+    still decompressed into memory, so reads are not zero-copy.
+    """
+    if not os.path.isdir(snapshot_dir) or not any(
+        name.startswith("month=") for name in os.listdir(snapshot_dir)
+    ):
+        schema = ATTEMPT_SCHEMA.append(pa.field("month", pa.string()))
+        if columns:
+            schema = pa.schema([schema.field(c) for c in columns])
+        return schema.empty_table()
+
+    filters = []
+    if start:
+        filters.append(("month", ">=", start.strftime("%Y-%m")))
+        filters.append(("answered_at", ">=", start))
+    if end:
+        filters.append(("month", "<=", end.strftime("%Y-%m")))
+        filters.append(("answered_at", "<", end))
+
+    with _read_lock(snapshot_dir):
+        return pq.read_table(
+            snapshot_dir,
+            columns=columns,
+            filters=filters or None,
+            partitioning=ds.partitioning(
+                pa.schema([("month", pa.string())]), flavor="hive"
+            ),
+            memory_map=True,
+        )
+
+
+def _with_accuracy(grouped: pa.Table, by: list, correct: str, attempts: str) -> pa.Table:
+    result = pa.table({
+        **{c: grouped[c] for c in by},
+        "correct": grouped[correct],
+        "attempts": grouped[attempts],
+        "accuracy": pc.divide(pc.cast(grouped[correct], pa.float64()), grouped[attempts]),
+    })
+    return result.sort_by([(c, "ascending") for c in by])
+
+
+def accuracy_rollup(by=("store_id", "sop_topic", "week"), start: datetime = None,
+                    end: datetime = None, snapshot_dir: str = SNAPSHOT_DIR) -> pa.Table:
+    """
+    Attempts, correct answers and accuracy grouped by `by` (any snapshot columns,
+    e.g. store_id / sop_topic / week / month / user_id).
+    """
+    by = list(by)
+    table = load_attempts(by + ["is_correct"], start, end, snapshot_dir)
+    table = table.set_column(
+        table.schema.get_field_index("is_correct"),
+        "is_correct",
+        pc.cast(table["is_correct"], pa.int64()),
+    )
+    grouped = table.group_by(by).aggregate([("is_correct", "sum"), ("is_correct", "count")])
+    return _with_accuracy(grouped, by, "is_correct_sum", "is_correct_count")
+
+
+# Dimensions kept in the daily rollup that cohort pivots are computed from.
+ROLLUP_DIMENSIONS = ("store_id", "sop_topic", "difficulty")
+BUCKETS = ("day", "week", "month")
+
+
+def rollup_since(after: datetime = None, snapshot_dir: str = SNAPSHOT_DIR):
+    """
+    Correct/attempt counts per ROLLUP_DIMENSIONS x day over attempts answered
+    after `after` (all attempts if None). Returns (rollup, newest answered_at
+    read), the latter to pass as `after` on the next incremental refresh.
+    """
+    table = load_attempts(list(ROLLUP_DIMENSIONS) + ["answered_at", "is_correct"],
+                          start=after, snapshot_dir=snapshot_dir)
+    if after is not None:
+        table = table.filter(pc.greater(table["answered_at"], pa.scalar(after, table["answered_at"].type)))
+    newest = pc.max(table["answered_at"]).as_py() if table.num_rows else after
+    table = pa.table({
+        **{c: table[c] for c in ROLLUP_DIMENSIONS},
+        "day": pc.cast(table["answered_at"], pa.date32()),
+        "is_correct": pc.cast(table["is_correct"], pa.int64()),
+    })
+    by = list(ROLLUP_DIMENSIONS) + ["day"]
+    grouped = table.group_by(by).aggregate([("is_correct", "sum"), ("is_correct", "count")])
+    rollup = _with_accuracy(grouped, by, "is_correct_sum", "is_correct_count")
+    return rollup.select(by + ["correct", "attempts"]), newest
+
+
+def daily_rollup(snapshot_dir: str = SNAPSHOT_DIR) -> pa.Table:
+    """
+    Correct/attempt counts per ROLLUP_DIMENSIONS x day. Orders of magnitude
+    smaller than the attempt snapshot, so pivots over it are cheap.
+    """
+    return rollup_since(None, snapshot_dir)[0]
+
+
+def merge_rollups(rollup: pa.Table, increment: pa.Table) -> pa.Table:
+    """Add the counts of an incremental rollup to an existing one."""
+    if not increment.num_rows:
+        return rollup
+    by = list(ROLLUP_DIMENSIONS) + ["day"]
+    grouped = pa.concat_tables([rollup, increment]).group_by(by).aggregate(
+        [("correct", "sum"), ("attempts", "sum")]
+    )
+    merged = _with_accuracy(grouped, by, "correct_sum", "attempts_sum")
+    return merged.select(by + ["correct", "attempts"])
+
+
+def pivot(rollup: pa.Table, dims: list, bucket: str = None, start=None, end=None,
+          filters: dict = None) -> dict:
+    """
+    Aggregate a daily rollup over `dims` (subset of ROLLUP_DIMENSIONS) and an
+    optional time bucket. Days are filtered to [start, end). The result is
+    dictionary-encoded: one label list per dimension and one
+    [index..., attempts, accuracy] row per non-empty cell.
+    """
+    table = rollup
+    if start:
+        table = table.filter(pc.greater_equal(table["day"], pa.scalar(start, pa.date32())))
+    if end:
+        table = table.filter(pc.less(table["day"], pa.scalar(end, pa.date32())))
+    for column, value in (filters or {}).items():
+        if value is not None:
+            table = table.filter(pc.equal(table[column], value))
+
+    keys = list(dict.fromkeys(dims))
+    if bucket:
+        # "day" is already a rollup column; coarser buckets are derived from it
+        if bucket != "day":
+            table = table.append_column(
+                bucket, pc.floor_temporal(table["day"], unit=bucket, week_starts_monday=True)
+            )
+        keys.append(bucket)
+
+    if keys and not table.num_rows:
+        return {"dimensions": keys, "labels": {key: [] for key in keys}, "cells": []}
+    if keys:
+        grouped = table.group_by(keys).aggregate([("correct", "sum"), ("attempts", "sum")])
+        grouped = _with_accuracy(grouped, keys, "correct_sum", "attempts_sum")
+    else:
+        total = pc.sum(table["attempts"]).as_py() or 0
+        grouped = pa.table({
+            "attempts": [total],
+            "accuracy": [(pc.sum(table["correct"]).as_py() or 0) / total if total else None],
+        })
+
+    labels = {}
+    indices = []
+    for key in keys:
+        encoded = pc.dictionary_encode(grouped[key]).combine_chunks()
+        labels[key] = [v.isoformat() if hasattr(v, "isoformat") else v
+                       for v in encoded.dictionary.to_pylist()]
+        indices.append(encoded.indices.to_pylist())
+    accuracy = [None if a is None else round(a, 4) for a in grouped["accuracy"].to_pylist()]
+    cells = [list(row) for row in zip(*indices, grouped["attempts"].to_pylist(), accuracy)]
+    return {"dimensions": keys, "labels": labels, "cells": cells}
+
+
+if __name__ == "__main__":
+    export_snapshot()
+    print(accuracy_rollup().slice(0, 50))
@@ -0,0 +1,88 @@
+import argparse
+import statistics
+import time
+
+import requests
+
+# Measures what ETags and compression save on a running backend:
+#   python -m backend.benchmarks.http_cache --quiz-id <id> --user-id <id>
+# Against a server started with LERNA_STORAGE=local LERNA_LOCAL_SEED=<scale>,
+# pass --local-seed <scale> instead to pick ids from the same synthetic data.
+# For each endpoint it compares a plain GET, a compressed GET and a
+# conditional GET (If-None-Match) on bytes over the wire and latency.
+
+
+def _fetch(url: str, headers: dict):
+    start = time.perf_counter()
+    resp = requests.get(url, headers=headers, stream=True)
+    wire = resp.raw.read(decode_content=False)
+    elapsed = (time.perf_counter() - start) * 1000
+    return resp, len(wire), elapsed
+
+
+def measure(url: str, repeat: int = 20) -> dict:
+    plain = [_fetch(url, {"Accept-Encoding": "identity"}) for _ in range(repeat)]
+    compressed = [_fetch(url, {"Accept-Encoding": "br, gzip"}) for _ in range(repeat)]
+
+    etag = compressed[-1][0].headers.get("ETag")
+    conditional = []
+    if etag:
+        conditional = [
+            _fetch(url, {"Accept-Encoding": "br, gzip", "If-None-Match": etag})
+            for _ in range(repeat)
+        ]
+
+    def summary(samples):
+        if not samples:
+            return None
+        return {
+            "status": samples[-1][0].status_code,
+            "bytes": samples[-1][1],
+            "p50_ms": round(statistics.median(s[2] for s in samples), 2),
+        }
+
+    return {
+        "url": url,
+        "encoding": compressed[-1][0].headers.get("Content-Encoding", "identity"),
+        "plain": summary(plain),
+        "compressed": summary(compressed),
+        "conditional": summary(conditional),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--quiz-id")
+    parser.add_argument("--user-id")
+    parser.add_argument("--local-seed", help="<scale>[:<seed>] the server was started with")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.local_seed:
+        from backend.benchmarks.synthetic import SCALES, generate
+        scale, _, seed = args.local_seed.partition(":")
+        data = generate(seed=int(seed or 42), **SCALES[scale])
+        args.quiz_id = args.quiz_id or data["quizzes"][0]["id"]
+        reported = [r["user_id"] for r in data["user_reports"]] or [u["id"] for u in data["users"]]
+        args.user_id = args.user_id or reported[0]
+
+    paths = ["/manager/progress", "/manager/heatmap", "/employee/bundle"]
+    if args.quiz_id:
+        paths.append(f"/quiz/{args.quiz_id}")
+    if args.user_id:
+        paths.append(f"/manager/report/{args.user_id}")
+        paths.append(f"/employee/quizzes/{args.user_id}")
+
+    print(f"{'endpoint':40} {'enc':8} {'plain B':>9} {'comp B':>9} {'304 B':>7} "
+          f"{'plain ms':>9} {'comp ms':>9} {'304 ms':>8}")
+    for path in paths:
+        r = measure(args.base_url + path, args.repeat)
+        cond = r["conditional"] or {"bytes": "-", "p50_ms": "-"}
+        print(f"{path:40} {r['encoding']:8} {r['plain']['bytes']:>9} {r['compressed']['bytes']:>9} "
+              f"{cond['bytes']:>7} {r['plain']['p50_ms']:>9} {r['compressed']['p50_ms']:>9} "
+              f"{cond['p50_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
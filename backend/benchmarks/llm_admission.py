@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from backend.llm_scheduler import BATCH, INTERACTIVE, AdmissionError, LLMScheduler
+
+# Load test for the LLM admission scheduler with a fake LLM:
+#   python -m backend.benchmarks.llm_admission --interactive-rps 4 --batch-jobs 200
+# Interactive turns arrive as a Poisson stream from many users while a batch
+# backlog is submitted up front. --fifo runs the same load with one priority
+# class and no reserve, for comparison.
+
+
+class FakeLLM:
+    def __init__(self, latency_ms: float = 800, jitter_ms: float = 200, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rng = random.Random(seed)
+
+    def __call__(self, prompt: str) -> str:
+        delay = max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        time.sleep(delay)
+        return f"fake response to {len(prompt)} chars"
+
+
+def _percentiles(samples: list) -> dict:
+    if not samples:
+        return {"n": 0}
+    samples = sorted(samples)
+
+    def pct(q):
+        return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1)
+
+    return {"n": len(samples), "p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99),
+            "mean": round(statistics.mean(samples) * 1000, 1)}
+
+
+async def run_load(scheduler: LLMScheduler, llm: FakeLLM, duration: float, interactive_rps: float,
+                   batch_jobs: int, users: int, stores: int, fifo: bool, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    latencies = {INTERACTIVE: [], BATCH: []}
+    rejected = {INTERACTIVE: 0, BATCH: 0}
+
+    async def one(kind: int, user_id: str = None, store_id: str = None):
+        start = time.monotonic()
+        try:
+            await scheduler.submit(llm, "x" * 400, priority=BATCH if fifo else kind,
+                                   user_id=user_id, store_id=store_id)
+            latencies[kind].append(time.monotonic() - start)
+        except AdmissionError:
+            rejected[kind] += 1
+
+    tasks = [asyncio.create_task(one(BATCH)) for _ in range(batch_jobs)]
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        await asyncio.sleep(rng.expovariate(interactive_rps))
+        user = rng.randrange(users)
+        tasks.append(asyncio.create_task(
+            one(INTERACTIVE, f"user-{user}", f"store-{user % stores}")))
+    await asyncio.gather(*tasks)
+
+    return {
+        "interactive": {**_percentiles(latencies[INTERACTIVE]), "rejected": rejected[INTERACTIVE]},
+        "batch": {**_percentiles(latencies[BATCH]), "rejected": rejected[BATCH]},
+        "scheduler": scheduler.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--interactive-rps", type=float, default=2)
+    parser.add_argument("--batch-jobs", type=int, default=100)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--stores", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--reserve", type=int, default=1)
+    parser.add_argument("--batch-deadline", type=float, default=3600)
+    parser.add_argument("--fifo", action="store_true")
+    args = parser.parse_args()
+
+    scheduler = LLMScheduler(
+        concurrency=args.concurrency,
+        interactive_reserve=0 if args.fifo else args.reserve,
+        deadlines={INTERACTIVE: 15.0, BATCH: args.batch_deadline},
+    )
+    llm = FakeLLM(args.latency_ms, args.jitter_ms)
+    result = asyncio.run(run_load(scheduler, llm, args.duration, args.interactive_rps,
+                                  args.batch_jobs, args.users, args.stores, args.fifo))
+    for kind in ("interactive", "batch"):
+        print(kind, result[kind])
+    print("scheduler", result["scheduler"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+
+# Endpoint benchmark suite over synthetic data, the in-memory storage stand-in
+# and a fake LLM latency:
+#   python -m backend.benchmarks.run --scales small medium --save-baseline bench.json
+#   python -m backend.benchmarks.run --scales small medium --compare bench.json
+#   python -m backend.benchmarks.run --llm-replay data/llm_recordings.jsonl
+# Storage, the shared cache and the snapshot directory must be configured
+# before the backend is imported, hence the environment set-up below.
+_WORKDIR = tempfile.mkdtemp(prefix="lerna-bench-")
+os.environ["LERNA_STORAGE"] = "local"
+os.environ["LERNA_CACHE_PATH"] = os.path.join(_WORKDIR, "cache.sqlite3")
+os.environ["LERNA_SNAPSHOT_DIR"] = os.path.join(_WORKDIR, "snapshot")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend import cache, db, llm_helper, llm_transport  # noqa: E402
+from backend.analytics_snapshot import SNAPSHOT_DIR  # noqa: E402
+from backend.benchmarks.llm_admission import FakeLLM  # noqa: E402
+from backend.benchmarks.synthetic import SCALES, generate  # noqa: E402
+from backend.llm_scheduler import LLMScheduler  # noqa: E402
+from backend.main import app  # noqa: E402
+from backend.routers import ai_training, manager, quiz  # noqa: E402
+
+LLM_FUNCTIONS = ("generate_roleplay_chat_response", "generate_roleplay_scenario_feedback",
+                 "generate_ai_questions")
+# Identical runs on a busy single-core box differ by up to ~1.8x in p95 on
+# millisecond endpoints; the regressions worth catching are far larger.
+REGRESSION_THRESHOLD = 2.0
+# p95 of fewer samples is mostly noise (at 20 samples it is the 2nd slowest)
+MIN_COMPARE_SAMPLES = 50
+
+
+def install_fake_llm(latency_ms: float, jitter_ms: float):
+    """Add fake model latency in front of the LLM helpers the routers call."""
+    llm = FakeLLM(latency_ms, jitter_ms)
+    for name in LLM_FUNCTIONS:
+        real = getattr(llm_helper, name)
+
+        def fake(*args, _real=real, **kwargs):
+            llm("")
+            return _real(*args, **kwargs)
+
+        setattr(llm_helper, name, fake)
+        if hasattr(ai_training, name):
+            setattr(ai_training, name, fake)
+
+
+def install_unlimited_scheduler():
+    """
+    Measure the endpoints, not the per-user/per-store rate limits: with the
+    real limits most AI-training latency would be token-bucket sleeps.
+    (backend/benchmarks/llm_admission.py benchmarks admission itself.)
+    """
+    unlimited = LLMScheduler(user_rate=float("inf"), store_rate=float("inf"))
+    ai_training.scheduler = unlimited
+    quiz.scheduler = unlimited
+
+
+def load_scale(scale: str, seed: int) -> dict:
+    data = generate(seed=seed, **SCALES[scale])
+    db.supabase.reset()
+    for table, rows in data.items():
+        db.supabase.load(table, rows)
+    for namespace in ("quizzes", "attempts", "reports", "heatmap"):
+        cache.bump(namespace)
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+    manager._rollup.update(table=None, newest=None, version=None)
+    return data
+
+
+def endpoint_cases(data: dict, rng: random.Random) -> list:
+    users = [u["id"] for u in data["users"]]
+    reported = [r["user_id"] for r in data["user_reports"]] or users
+    quizzes = data["quizzes"]
+    stores = sorted({u["store_id"] for u in data["users"]})
+
+    def submit():
+        quiz = rng.choice(quizzes)
+        answer = quiz["answer"] if rng.random() < 0.6 else "wrong"
+        return {"quiz_id": quiz["id"], "user_id": rng.choice(users), "answer": answer}
+
+    def save():
+        return {"quiz": [{
+            "sop_topic": quizzes[0]["sop_topic"],
+            "question": f"Benchmark question {rng.random()}",
+            "options": [],
+            "answer": "answer",
+            "type": "fill_blank",
+        } for _ in range(5)]}
+
+    def sync():
+        return {"store_id": rng.choice(stores), "attempts": [{
+            "attempt_id": f"bench-{rng.getrandbits(64)}",
+            "user_id": rng.choice(users),
+            "quiz_id": rng.choice(quizzes)["id"],
+            "answer": "answer",
+        } for _ in range(20)]}
+
+    def caller():
+        user = rng.choice(data["users"])
+        return {"user_id": user["id"], "store_id": user["store_id"]}
+
+    def chat():
+        return {"message": "我想练习食品安全", "user_role": "food safety", "test_history": [], **caller()}
+
+    def feedback():
+        return {"scenario_id": "customer-complaint", "user_response": "先道歉，再重新做一份",
+                "user_role": "waiter", **caller()}
+
+    def questions_url():
+        ids = caller()
+        return ("/ai-training/generate-questions?category=food&difficulty=easy&count=5&user_role=cook"
+                f"&user_id={ids['user_id']}&store_id={ids['store_id']}")
+
+    # (name, method, url factory, body factory, heavy) -- heavy endpoints run fewer times
+    return [
+        ("GET /employee/quizzes", "GET", lambda: f"/employee/quizzes/{rng.choice(users)}", None, False),
+        ("POST /employee/submit", "POST", lambda: "/employee/submit", submit, False),
+        ("GET /employee/bundle", "GET", lambda: f"/employee/bundle?store_id={rng.choice(stores)}", None, False),
+        ("POST /employee/sync", "POST", lambda: "/employee/sync", sync, False),
+        ("GET /quiz/{id}", "GET", lambda: f"/quiz/{rng.choice(quizzes)['id']}", None, False),
+        ("POST /quiz/generate", "POST", lambda: "/quiz/generate", lambda: {"sop_text": "SOP"}, False),
+        ("POST /quiz/save", "POST", lambda: "/quiz/save", save, False),
+        ("GET /manager/progress", "GET", lambda: "/manager/progress", None, True),
+        ("GET /manager/report", "GET", lambda: f"/manager/report/{rng.choice(reported)}", None, False),
+        ("GET /manager/heatmap", "GET", lambda: "/manager/heatmap?dims=store_id,sop_topic&bucket=week", None, False),
+        ("POST /ai-training/roleplay-chat", "POST", lambda: "/ai-training/roleplay-chat", chat, False),
+        ("POST /ai-training/roleplay-feedback", "POST", lambda: "/ai-training/roleplay-feedback", feedback, False),
+        ("POST /ai-training/generate-questions", "POST", questions_url, None, False),
+    ]
+
+
+def _percentile(samples: list, q: float) -> float:
+    return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3)
+
+
+def bench_endpoint(client: TestClient, method: str, url, body, requests: int, warmup: int = 3) -> dict:
+    latencies = []
+    for i in range(warmup + requests):
+        kwargs = {"json": body()} if body else {}
+        start = time.perf_counter()
+        resp = client.request(method, url(), **kwargs)
+        elapsed = time.perf_counter() - start
+        if resp.status_code >= 400:
+            raise RuntimeError(f"{method} {resp.url} -> {resp.status_code}: {resp.text[:200]}")
+        if i >= warmup:
+            latencies.append(elapsed)
+    latencies.sort()
+    return {
+        "requests": requests,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "rps": round(len(latencies) / sum(latencies), 1),
+    }
+
+
+def run(scales: list, requests: int, seed: int) -> dict:
+    client = TestClient(app)
+    results = {}
+    for scale in scales:
+        data = load_scale(scale, seed)
+        rng = random.Random(seed)
+        print(f"\n== {scale}: {', '.join(f'{k}={len(v)}' for k, v in data.items())}")
+        scale_results = {}
+        for name, method, url, body, heavy in endpoint_cases(data, rng):
+            n = max(5, requests // 20) if heavy else requests
+            scale_results[name] = bench_endpoint(client, method, url, body, n)
+            r = scale_results[name]
+            print(f"{name:40} p50 {r['p50_ms']:>9} ms  p95 {r['p95_ms']:>9} ms  "
+                  f"p99 {r['p99_ms']:>9} ms  {r['rps']:>8} req/s")
+        # ru_maxrss is the process peak so far, in KiB on Linux
+        rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        print(f"peak RSS {rss_mb} MiB")
+        results[scale] = {"endpoints": scale_results, "peak_rss_mb": rss_mb}
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD,
+            min_samples: int = MIN_COMPARE_SAMPLES) -> int:
+    """
+    Print p95 ratios against a saved run and count regressions. Endpoints
+    measured with fewer than `min_samples` requests are shown but never flagged.
+    """
+    regressions = 0
+    print("\n== comparison with baseline (p95, ratio new/old)")
+    for scale, scale_results in results.items():
+        old_scale = baseline.get(scale)
+        if not old_scale:
+            print(f"{scale}: not in baseline")
+            continue
+        for name, r in scale_results["endpoints"].items():
+            old = old_scale["endpoints"].get(name)
+            if not old:
+                continue
+            ratio = r["p95_ms"] / old["p95_ms"] if old["p95_ms"] else float("inf")
+            if min(r["requests"], old["requests"]) < min_samples:
+                flag = f"(n<{min_samples}, not compared)"
+            else:
+                flag = "REGRESSION" if ratio > threshold else ("faster" if ratio < 1 / threshold else "")
+            regressions += flag == "REGRESSION"
+            print(f"{scale:7} {name:40} {old['p95_ms']:>9} -> {r['p95_ms']:>9} ms  x{ratio:5.2f} {flag}")
+        print(f"{scale:7} peak RSS {old_scale['peak_rss_mb']} -> {scale_results['peak_rss_mb']} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", default=["small", "medium"], choices=list(SCALES))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=0)
+    parser.add_argument("--llm-replay", help="serve LLM calls from a recording instead of fake latency")
+    parser.add_argument("--llm-latency-scale", type=float, default=1.0)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--min-samples", type=int, default=MIN_COMPARE_SAMPLES)
+    args = parser.parse_args()
+
+    if args.llm_replay:
+        llm_transport.configure("replay", args.llm_replay, latency_scale=args.llm_latency_scale)
+    else:
+        llm_transport.configure(None)
+        install_fake_llm(args.llm_latency_ms, args.llm_jitter_ms)
+    install_unlimited_scheduler()
+    try:
+        results = run(args.scales, args.requests, args.seed)
+    finally:
+        shutil.rmtree(_WORKDIR, ignore_errors=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_samples)
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
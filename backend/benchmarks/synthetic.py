@@ -0,0 +1,138 @@
+import math
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Deterministic synthetic data for benchmarks: stores, users, bilingual quizzes
+# with Zipf-skewed topics, and attempts whose correctness follows a Rasch model
+# (user ability vs. question difficulty). Same seed and scale, same tables.
+TOPICS = [
+    ("Corporate Culture", "企业文化"),
+    ("Food Safety", "食品安全"),
+    ("Customer Service", "客户服务"),
+    ("Dish Preparation", "菜品制作"),
+    ("Fire Safety", "消防安全"),
+    ("Personal Safety", "个人安全"),
+    ("Hygiene Standards", "卫生规范"),
+    ("Compensation", "薪酬制度"),
+    ("Inventory", "库存管理"),
+    ("Opening Checklist", "开店流程"),
+]
+TOPIC_SKEW = 1.1
+
+SCALES = {
+    "small": {"stores": 5, "users_per_store": 10, "quizzes": 100, "attempts": 5_000},
+    "medium": {"stores": 30, "users_per_store": 20, "quizzes": 500, "attempts": 50_000},
+    "large": {"stores": 30, "users_per_store": 50, "quizzes": 2_000, "attempts": 300_000},
+}
+
+_EN_QUESTIONS = [
+    "What is the correct procedure for {t} step {n}?",
+    "Which of the following best describes the {t} standard #{n}?",
+    "How many minutes are allowed for {t} task {n}?",
+]
+_ZH_QUESTIONS = [
+    "{t}第{n}条规定的正确做法是什么？",
+    "关于{t}，以下哪项描述符合第{n}项标准？",
+    "{t}任务{n}需要在多少分钟内完成？",
+]
+_ZH_NAMES = "王李张刘陈杨黄赵吴周"
+_ZH_GIVEN = ["伟", "芳", "娜", "敏", "静", "磊", "洋", "勇", "艳", "杰"]
+_EN_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie"]
+_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _topic_weights():
+    return [1 / (k + 1) ** TOPIC_SKEW for k in range(len(TOPICS))]
+
+
+def generate(seed: int = 42, stores: int = 5, users_per_store: int = 10, quizzes: int = 100,
+             attempts: int = 5_000, days: int = 365, report_share: float = 0.2) -> dict:
+    rng = random.Random(seed)
+    weights = _topic_weights()
+
+    users = []
+    for s in range(stores):
+        store_id = f"store-{s:02d}"
+        for _ in range(users_per_store):
+            if rng.random() < 0.7:
+                name = rng.choice(_ZH_NAMES) + rng.choice(_ZH_GIVEN)
+            else:
+                name = f"{rng.choice(_EN_NAMES)} {chr(65 + rng.randrange(26))}."
+            users.append({
+                "id": _uuid(rng),
+                "name": name,
+                "role": "employee",
+                "store_id": store_id,
+                "_ability": rng.gauss(0.5, 1.0),
+            })
+
+    quiz_rows = []
+    for n in range(quizzes):
+        en, zh = rng.choices(TOPICS, weights)[0]
+        chinese = rng.random() < 0.5
+        topic = zh if chinese else en
+        template = rng.choice(_ZH_QUESTIONS if chinese else _EN_QUESTIONS)
+        options = [f"{'选项' if chinese else 'Option'} {chr(65 + i)}-{n}" for i in range(4)]
+        is_choice = rng.random() < 0.6
+        answer = rng.choice(options) if is_choice else (f"答案{n}" if chinese else f"Answer {n}")
+        difficulty = rng.gauss(0, 1)
+        quiz_rows.append({
+            "id": _uuid(rng),
+            "sop_topic": topic,
+            "question": template.format(t=topic, n=n),
+            "options": options if is_choice else [],
+            "answer": answer,
+            "type": "choice" if is_choice else "fill_blank",
+            "difficulty": "easy" if difficulty < 0 else "medium",
+            "source_text": (f"{topic}标准第{n}条：" if chinese else f"{topic} standard {n}: ") + answer,
+            "tags": [en.lower().replace(" ", "_")],
+            "_difficulty": difficulty,
+        })
+
+    # Topic skew also applies to what people practise
+    by_topic = {}
+    for q in quiz_rows:
+        by_topic.setdefault(q["sop_topic"], []).append(q)
+    topic_names = list(by_topic)
+    topic_weight = [sum(1 for _ in by_topic[t]) for t in topic_names]
+
+    attempt_rows = []
+    span = days * 86400
+    for _ in range(attempts):
+        user = rng.choice(users)
+        quiz = rng.choice(by_topic[rng.choices(topic_names, topic_weight)[0]])
+        p = 1 / (1 + math.exp(quiz["_difficulty"] - user["_ability"]))
+        correct = rng.random() < p
+        if correct:
+            answer = quiz["answer"] if rng.random() < 0.8 else f"  {quiz['answer'].upper()} "
+        else:
+            answer = rng.choice(quiz["options"]) if quiz["options"] else "不确定 / not sure"
+            correct = answer.strip().lower() == quiz["answer"].strip().lower()
+        answered_at = _START + timedelta(seconds=rng.randrange(span), microseconds=rng.randrange(1, 10**6))
+        attempt_rows.append({
+            "id": _uuid(rng),
+            "user_id": user["id"],
+            "quiz_id": quiz["id"],
+            "answer": answer,
+            "is_correct": correct,
+            "answered_at": answered_at.isoformat(timespec="microseconds"),
+        })
+    attempt_rows.sort(key=lambda r: r["answered_at"])
+
+    reports = [
+        {"user_id": u["id"], "summary": "Employee Training Analysis Report\n" + "\n".join(
+            f"- {rng.choice(TOPICS)[rng.randrange(2)]}: {'需要加强' if rng.random() < 0.5 else 'strong area'}"
+            for _ in range(40))}
+        for u in users if rng.random() < report_share
+    ]
+
+    for row in users:
+        row.pop("_ability")
+    for row in quiz_rows:
+        row.pop("_difficulty")
+    return {"users": users, "quizzes": quiz_rows, "quiz_attempts": attempt_rows, "user_reports": reports}
@@ -0,0 +1,136 @@
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from backend.benchmarks.synthetic import SCALES, generate
+
+# Multi-worker scaling of the API under gunicorn (see start.sh), with every
+# worker seeded with the same synthetic data (LERNA_STORAGE=local,
+# LERNA_LOCAL_SEED) and sharing one cache file:
+#   python -m backend.benchmarks.workers --workers 1 2 4 --clients 16 --duration 20
+# Closed-loop clients replay a read-heavy employee mix; throughput should grow
+# with workers until the machine runs out of cores.
+PORT = 8031
+
+
+def _mix(data: dict, rng: random.Random):
+    users = [u["id"] for u in data["users"]]
+    quizzes = data["quizzes"]
+    stores = sorted({u["store_id"] for u in data["users"]})
+
+    def submit():
+        quiz = rng.choice(quizzes)
+        return "POST", "/employee/submit", {
+            "quiz_id": quiz["id"], "user_id": rng.choice(users), "answer": quiz["answer"],
+        }
+
+    # (weight, request factory)
+    return [
+        (4, lambda: ("GET", f"/quiz/{rng.choice(quizzes)['id']}", None)),
+        (3, lambda: ("GET", f"/employee/quizzes/{rng.choice(users)}", None)),
+        (2, lambda: ("GET", f"/employee/bundle?store_id={rng.choice(stores)}", None)),
+        (1, submit),
+    ]
+
+
+def _start(workers: int, seed: str, workdir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "LERNA_STORAGE": "local",
+        "LERNA_LOCAL_SEED": seed,
+        "LERNA_CACHE_PATH": os.path.join(workdir, "cache.sqlite3"),
+        "LERNA_SNAPSHOT_DIR": os.path.join(workdir, "snapshot"),
+        "WORKERS": str(workers),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "backend.main:app", "-k", "uvicorn.workers.UvicornWorker",
+         "-w", str(workers), "-b", f"127.0.0.1:{PORT}", "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    # Ready once every worker has loaded its data and answers
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{PORT}/docs", timeout=1).status_code == 200:
+                time.sleep(2 * workers)
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError(f"gunicorn with {workers} workers did not start")
+
+
+def run_load(data: dict, clients: int, duration: float, seed: int = 0) -> dict:
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+
+    def client(i):
+        rng = random.Random(seed + i)
+        weighted = [factory for weight, factory in _mix(data, rng) for _ in range(weight)]
+        with httpx.Client(base_url=f"http://127.0.0.1:{PORT}", timeout=30) as http:
+            while time.monotonic() < stop:
+                method, url, body = rng.choice(weighted)()
+                start = time.perf_counter()
+                resp = http.request(method, url, json=body)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    errors[0] += resp.status_code >= 400
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+
+    def pct(q):
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--scale", default="small", choices=list(SCALES))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    data = generate(seed=args.seed, **SCALES[args.scale])
+    print(f"cpus={os.cpu_count()} clients={args.clients} duration={args.duration}s scale={args.scale}")
+    for workers in args.workers:
+        workdir = tempfile.mkdtemp(prefix="lerna-workers-")
+        proc = _start(workers, f"{args.scale}:{args.seed}", workdir)
+        try:
+            r = run_load(data, args.clients, args.duration)
+        finally:
+            proc.terminate()
+            proc.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"workers={workers:<3} {r['rps']:>8} req/s  p50 {r['p50_ms']:>7} ms  "
+              f"p95 {r['p95_ms']:>7} ms  errors {r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
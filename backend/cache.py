@@ -0,0 +1,164 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# Versioned cache shared by all worker processes on the box. Entries live in a
+# namespace ("attempts", "quizzes", "reports", ...); writers call
+# bump(namespace) and every entry cached under an older version of that
+# namespace is treated as a miss, in this worker and in every other one.
+#
+# Namespace versions and shared entries are kept in a local SQLite file (WAL,
+# so readers never block on a writer). Each worker also keeps decoded values in
+# memory; those are still checked against the shared version on every get.
+#
+# The same file holds token buckets shared by the workers (see
+# llm_scheduler.SharedTokenBucket), so a rate limit holds for the whole box.
+CACHE_PATH = os.getenv("LERNA_CACHE_PATH", "data/cache.sqlite3")
+MAX_ENTRIES = 1024
+MAX_SHARED_ENTRIES = 10_000
+TRIM_EVERY = 256           # puts per worker between size checks of the shared table
+
+_lock = threading.Lock()
+_local = threading.local()
+_entries = {}
+_puts = 0
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS versions (namespace TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, version INTEGER NOT NULL,"
+            " value BLOB NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL,"
+            " rate REAL NOT NULL, capacity REAL NOT NULL)"
+        )
+        _local.conn = conn
+    return conn
+
+
+def version(namespace: str) -> int:
+    row = _connect().execute(
+        "SELECT version FROM versions WHERE namespace = ?", (namespace,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def bump(namespace: str) -> int:
+    conn = _connect()
+    conn.execute(
+        "INSERT INTO versions (namespace, version) VALUES (?, 1) "
+        "ON CONFLICT(namespace) DO UPDATE SET version = version + 1",
+        (namespace,),
+    )
+    # Entries of older versions can never be read again
+    conn.execute(
+        "DELETE FROM entries WHERE namespace = ? AND version < "
+        "(SELECT version FROM versions WHERE namespace = ?)",
+        (namespace, namespace),
+    )
+    return version(namespace)
+
+
+def get(namespace: str, key):
+    current = version(namespace)
+    entry = _entries.get((namespace, key))
+    if entry is not None and entry[0] == current:
+        return entry[1]
+
+    row = _connect().execute(
+        "SELECT value FROM entries WHERE namespace = ? AND key = ? AND version = ?",
+        (namespace, repr(key), current),
+    ).fetchone()
+    if row is None:
+        return None
+    value = pickle.loads(row[0])
+    _remember(namespace, key, current, value)
+    return value
+
+
+def _remember(namespace: str, key, at_version: int, value):
+    with _lock:
+        if len(_entries) >= MAX_ENTRIES:
+            _entries.pop(next(iter(_entries)))
+        _entries[(namespace, key)] = (at_version, value)
+
+
+def put(namespace: str, key, value, at_version: int = None, shared: bool = True):
+    """
+    Cache `value`. Pass the version read before computing it so a bump that
+    happened meanwhile leaves the entry already stale. shared=False keeps the
+    value in this worker only (for large objects), still invalidated by bumps.
+    """
+    global _puts
+    at_version = version(namespace) if at_version is None else at_version
+    _remember(namespace, key, at_version, value)
+    if not shared:
+        return
+    conn = _connect()
+    conn.execute(
+        "INSERT OR REPLACE INTO entries (namespace, key, version, value) VALUES (?, ?, ?, ?)",
+        (namespace, repr(key), at_version, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+    )
+    with _lock:
+        _puts += 1
+        if _puts % TRIM_EVERY:
+            return
+    # The table may overshoot by TRIM_EVERY puts per worker between checks
+    count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    if count > MAX_SHARED_ENTRIES:
+        conn.execute(
+            "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY rowid LIMIT ?)",
+            (count - MAX_SHARED_ENTRIES,),
+        )
+
+
+def take_token(key: str, rate: float, capacity: float) -> float:
+    """
+    Take one token from the shared bucket `key`, letting the balance go
+    negative, and return the seconds until that token is covered.
+    """
+    conn = _connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+        # Clocks of different workers may disagree slightly: never refill backwards
+        tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+        tokens -= 1
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (key, tokens, updated, rate, capacity) VALUES (?, ?, ?, ?, ?)",
+            (key, tokens, max(now, row[1]) if row else now, rate, capacity),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return max(0.0, -tokens / rate)
+
+
+def return_token(key: str):
+    _connect().execute(
+        "UPDATE buckets SET tokens = MIN(capacity, tokens + 1) WHERE key = ?", (key,)
+    )
+
+
+def drop_full_bucket(key: str) -> bool:
+    """Delete the bucket if it has refilled to capacity; True if it is gone."""
+    conn = _connect()
+    conn.execute(
+        "DELETE FROM buckets WHERE key = ? AND tokens + MAX(0, ? - updated) * rate >= capacity",
+        (key, time.time()),
+    )
+    return conn.execute("SELECT 1 FROM buckets WHERE key = ?", (key,)).fetchone() is None
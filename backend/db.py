@@ -2,10 +2,23 @@ from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
 import random
+from backend import cache
 
 load_dotenv()
 
-supabase: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
+if os.getenv("LERNA_STORAGE") == "local":
+    # In-memory stand-in for benchmarks and offline development
+    from backend.local_store import LocalClient
+    supabase = LocalClient()
+    if os.getenv("LERNA_LOCAL_SEED"):
+        # LERNA_LOCAL_SEED=<scale>[:<seed>] loads synthetic data at start-up;
+        # generation is deterministic, so every worker holds the same tables.
+        from backend.benchmarks.synthetic import SCALES, generate
+        scale, _, seed = os.getenv("LERNA_LOCAL_SEED").partition(":")
+        for table, rows in generate(seed=int(seed or 42), **SCALES[scale]).items():
+            supabase.load(table, rows)
+else:
+    supabase: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
 
 def save_quiz_to_db(question_obj: dict):
     data = {
@@ -20,28 +33,49 @@ def save_quiz_to_db(question_obj: dict):
     }
     print("Inserting:", data)
     supabase.table("quizzes").insert(data).execute()
+    cache.bump("quizzes")
+
+# Answer normalization shared by server grading and offline bundles, which ship
+# these rules so store clients grade exactly like submit_quiz.
+NORMALIZATION_RULES = {"strip": True, "lowercase": True}
+
+def normalize_answer(text: str) -> str:
+    return (text or "").strip().lower()
+
+def is_correct_answer(user_answer: str, correct_answer: str) -> bool:
+    return normalize_answer(user_answer) == normalize_answer(correct_answer)
 
 def grade_quiz_attempt(questions: list, responses: list):
     score = 0
     for q, user_answer in zip(questions, responses):
         correct_answer = q.get("answer")
-        if user_answer.strip().lower() == correct_answer.strip().lower():
+        if is_correct_answer(user_answer, correct_answer):
             score += 1
     return score, len(questions)
 
 import random
 
+def get_quizzes(topic: str = None, difficulty: str = None):
+    """
+    All quizzes matching the filter. The pool is cached until quizzes change.
+    """
+    key = ("pool", topic, difficulty)
+    at = cache.version("quizzes")
+    all_quizzes = cache.get("quizzes", key)
+    if all_quizzes is None:
+        # Build filter
+        query = supabase.table("quizzes").select("*")
+        if topic:
+            query = query.eq("sop_topic", topic)
+        if difficulty:
+            query = query.eq("difficulty", difficulty)
+        result = query.execute()
+        all_quizzes = result.data or []
+        cache.put("quizzes", key, all_quizzes, at_version=at)
+    return all_quizzes
+
 def get_random_quizzes(count: int = 5, topic: str = None, difficulty: str = None):
-    # Build filter
-    query = supabase.table("quizzes").select("*")
-    if topic:
-        query = query.eq("sop_topic", topic)
-    if difficulty:
-        query = query.eq("difficulty", difficulty)
-
-    # Fetch from supabase
-    result = query.execute()
-    all_quizzes = result.data or []
+    all_quizzes = get_quizzes(topic, difficulty)
     # Random sample
     if len(all_quizzes) <= count:
         return all_quizzes
@@ -52,8 +86,13 @@ def get_quiz_info(quiz_id: str):
     """
     Retrieve a single quiz by its ID.
     """
-    result = supabase.table("quizzes").select("*").eq("id", quiz_id).single().execute()
-    return result.data
+    at = cache.version("quizzes")
+    quiz = cache.get("quizzes", ("quiz", quiz_id))
+    if quiz is None:
+        result = supabase.table("quizzes").select("*").eq("id", quiz_id).single().execute()
+        quiz = result.data
+        cache.put("quizzes", ("quiz", quiz_id), quiz, at_version=at)
+    return quiz
 
 
 def save_quiz_attempt(user_id: str, quiz_id: str, answer: str, correct: bool):
@@ -65,6 +104,35 @@ def save_quiz_attempt(user_id: str, quiz_id: str, answer: str, correct: bool):
     }
     print("Logging attempt:", data)
     supabase.table("quiz_attempts").insert(data).execute()
+    cache.bump("attempts")
+
+
+def get_known_user_ids(user_ids) -> set:
+    """
+    The subset of `user_ids` that exist in users.
+    """
+    user_ids = sorted({str(u) for u in user_ids})
+    if not user_ids:
+        return set()
+    response = supabase.table("users").select("id").in_("id", user_ids).execute()
+    return {str(row["id"]) for row in response.data}
+
+
+def save_quiz_attempts(rows: list):
+    """
+    Batch-insert graded attempts uploaded from store clients. Rows carry a
+    client-generated client_attempt_id, so re-uploads of the same batch are no-ops.
+    """
+    if not rows:
+        return None
+    print(f"Logging {len(rows)} synced attempts")
+    result = (
+        supabase.table("quiz_attempts")
+        .upsert(rows, on_conflict="client_attempt_id", ignore_duplicates=True)
+        .execute()
+    )
+    cache.bump("attempts")
+    return result
 
 
 def get_all_submissions():
@@ -122,9 +190,14 @@ def save_user_report_to_db(user_id: str, summary: str):
         "user_id": user_id,
         "summary": summary
     }).execute()
+    cache.bump("reports")
     return result
 
 def get_user_report(user_id: str):
+    at = cache.version("reports")
+    cached = cache.get("reports", user_id)
+    if cached is not None:
+        return cached
     response = (
         supabase.table("user_reports")
         .select("summary")
@@ -134,5 +207,122 @@ def get_user_report(user_id: str):
     )
     print(response)
     if response.data:
-        return {"user_id": user_id, "summary": response.data[0]["summary"]}
+        report = {"user_id": user_id, "summary": response.data[0]["summary"]}
+        cache.put("reports", user_id, report, at_version=at)
+        return report
     return None
+
+_EXPORT_COLUMNS = """
+    id,
+    user_id,
+    quiz_id,
+    answer,
+    is_correct,
+    answered_at,
+    quizzes (
+        sop_topic,
+        question,
+        difficulty
+    ),
+    users (
+        name,
+        store_id
+    )
+"""
+
+def get_submissions_since(answered_after: str = None, page_size: int = 1000, answered_before: str = None):
+    """
+    Page through attempts (joined with quiz and user) in answered_at order,
+    starting strictly after `answered_after` and, if given, before
+    `answered_before`. Used by the analytics snapshot export and retention.
+    """
+    start = 0
+    while True:
+        query = (
+            supabase.table("quiz_attempts")
+            .select(_EXPORT_COLUMNS)
+            .order("answered_at")
+            .order("id")
+        )
+        if answered_after:
+            query = query.gt("answered_at", answered_after)
+        if answered_before:
+            query = query.lt("answered_at", answered_before)
+        rows = query.range(start, start + page_size - 1).execute().data or []
+        yield from rows
+        if len(rows) < page_size:
+            break
+        start += page_size
+
+def save_item_stats(rows: list):
+    """
+    Upsert calibrated per-question statistics (one row per quiz_id).
+    """
+    if not rows:
+        return None
+    return supabase.table("quiz_item_stats").upsert(rows, on_conflict="quiz_id").execute()
+
+def update_quiz_difficulty(quiz_id: str, difficulty: str):
+    result = supabase.table("quizzes").update({"difficulty": difficulty}).eq("id", quiz_id).execute()
+    cache.bump("quizzes")
+    return result
+
+def get_oldest_attempt_time():
+    response = (
+        supabase.table("quiz_attempts")
+        .select("answered_at")
+        .order("answered_at")
+        .limit(1)
+        .execute()
+    )
+    return response.data[0]["answered_at"] if response.data else None
+
+def save_attempt_rollups(rows: list):
+    """
+    Upsert per-user, per-question, per-day rollups of compacted attempts.
+    Rows are keyed on (user_id, quiz_id, day), so re-running a day overwrites it.
+    """
+    if not rows:
+        return None
+    return (
+        supabase.table("quiz_attempt_rollups")
+        .upsert(rows, on_conflict="user_id,quiz_id,day")
+        .execute()
+    )
+
+def delete_attempts_before(answered_before: str, answered_after: str = None):
+    query = supabase.table("quiz_attempts").delete().lt("answered_at", answered_before)
+    if answered_after:
+        query = query.gte("answered_at", answered_after)
+    result = query.execute()
+    cache.bump("attempts")
+    return result
+
+def save_topic_rollups(rows: list):
+    """
+    Upsert per-user, per-topic, per-month totals of compacted attempts.
+    Rows are keyed on (user_id, sop_topic, month) and recomputed from the
+    archive, so re-running a month overwrites it.
+    """
+    if not rows:
+        return None
+    return (
+        supabase.table("quiz_topic_rollups")
+        .upsert(rows, on_conflict="user_id,sop_topic,month")
+        .execute()
+    )
+
+def get_user_topic_history(user_id: str, limit: int = 120):
+    """
+    Compacted history of a user (older than the retention window) as monthly
+    per-topic totals, newest month first, at most `limit` rows.
+    """
+    response = (
+        supabase.table("quiz_topic_rollups")
+        .select("month, sop_topic, attempts, correct")
+        .eq("user_id", user_id)
+        .order("month", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return response.data or []
@@ -0,0 +1,137 @@
+import hashlib
+import re
+import time
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response
+from starlette.datastructures import Headers
+
+from backend import cache
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli-asgi is in requirements.txt; without it, gzip only
+    BrotliMiddleware = None
+
+COMPRESS_MIN_SIZE = 1024
+# Starlette's default gzip level 9 costs several times level 6 on large JSON
+# bodies for a few percent smaller output.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+# GET routes whose bodies only change when their cache namespace is bumped by a
+# write in db.py (for heatmaps, by a rollup refresh in routers/manager.py).
+# The randomised /employee/quizzes sample is deliberately absent.
+CONDITIONAL_ROUTES = [
+    (re.compile(r"^/quiz/(?!generate$|save$)[^/]+$"), "quizzes"),
+    (re.compile(r"^/manager/report/[^/]+$"), "reports"),
+    (re.compile(r"^/manager/heatmap$"), "heatmap"),
+    (re.compile(r"^/employee/bundle$"), "quizzes"),
+]
+
+
+class _Compression:
+    """
+    br through brotli-asgi when the client accepts it, otherwise gzip at
+    GZIP_LEVEL (brotli-asgi's own gzip fallback is fixed at level 9).
+    """
+
+    def __init__(self, app):
+        self.gzip = GZipMiddleware(app, minimum_size=COMPRESS_MIN_SIZE, compresslevel=GZIP_LEVEL)
+        self.brotli = None
+        if BrotliMiddleware is not None:
+            self.brotli = BrotliMiddleware(app, quality=BROTLI_QUALITY,
+                                           minimum_size=COMPRESS_MIN_SIZE, gzip_fallback=False)
+
+    async def __call__(self, scope, receive, send):
+        if (self.brotli is not None and scope["type"] == "http"
+                and "br" in Headers(scope=scope).get("accept-encoding", "")):
+            await self.brotli(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+def add_compression(app):
+    app.add_middleware(_Compression)
+
+
+def _namespace_for(path: str):
+    for pattern, namespace in CONDITIONAL_ROUTES:
+        if pattern.match(path):
+            return namespace
+    return None
+
+
+def _encoding_for(request: Request) -> str:
+    # Mirrors what the compression middleware will pick, so each encoded
+    # representation gets its own strong validator.
+    accept = request.headers.get("accept-encoding", "")
+    if BrotliMiddleware is not None and "br" in accept:
+        return "br"
+    if "gzip" in accept:
+        return "gzip"
+    return "identity"
+
+
+def _not_modified(request: Request, etag: str, last_modified: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _validator_headers(etag: str, last_modified: str) -> dict:
+    # Validators are per encoding, so a 304 must vary like the 200 it stands for
+    return {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding"}
+
+
+async def conditional_get(request: Request, call_next):
+    """
+    ETag / Last-Modified for catalog and report resources. Validators are kept in
+    the versioned cache, so a matching If-None-Match is answered with 304 before
+    the route (and the database) is reached.
+    """
+    namespace = _namespace_for(request.url.path)
+    if request.method != "GET" or namespace is None:
+        return await call_next(request)
+
+    key = ("http", request.url.path, request.url.query, _encoding_for(request))
+    validator = cache.get(namespace, key)
+    if validator and _not_modified(request, *validator):
+        return Response(status_code=304, headers=_validator_headers(*validator))
+
+    at = cache.version(namespace)
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    if validator and validator[0] == etag:
+        last_modified = validator[1]
+    else:
+        last_modified = formatdate(time.time(), usegmt=True)
+    cache.put(namespace, key, (etag, last_modified), at_version=at)
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=_validator_headers(etag, last_modified))
+
+    headers = dict(response.headers)
+    headers.pop("content-length", None)
+    validators = _validator_headers(etag, last_modified)
+    vary = headers.pop("vary", "")
+    if "accept-encoding" in vary.lower():
+        validators["Vary"] = vary
+    elif vary:
+        validators["Vary"] = f"{vary}, Accept-Encoding"
+    headers.update(validators)
+    return Response(content=body, status_code=200, headers=headers, media_type=response.media_type)
@@ -0,0 +1,275 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pyarrow.compute as pc
+
+from backend.analytics_snapshot import SNAPSHOT_DIR, export_snapshot, load_attempts, read_state
+from backend.db import save_item_stats, update_quiz_difficulty
+
+# Item analysis over the columnar attempt snapshot (see analytics_snapshot.py).
+# The user x question matrix is kept sparse as COO arrays (user_idx, item_idx,
+# correct); every statistic below is a bincount over those arrays.
+STATE_DIR = os.getenv("LERNA_ITEM_ANALYSIS_DIR", "data/item_analysis")
+MIN_ATTEMPTS = 30          # questions with fewer first attempts keep their hand-set label
+EASY_BELOW = -0.5          # Rasch difficulty (logits) thresholds for the labels
+HARD_ABOVE = 0.5
+MAX_ITER = 100
+TOL = 1e-4
+LOGIT_CLIP = 6.0
+
+
+def build_matrix(table):
+    """
+    Turn attempt rows into a sparse correctness matrix. Only each user's first
+    attempt at a question is kept, as is usual for item statistics.
+    Returns (user_ids, quiz_ids, users, items, correct).
+    """
+    table = table.sort_by([("answered_at", "ascending")])
+    user_enc = pc.dictionary_encode(table["user_id"]).combine_chunks()
+    item_enc = pc.dictionary_encode(table["quiz_id"]).combine_chunks()
+    users = user_enc.indices.to_numpy(zero_copy_only=False).astype(np.int64)
+    items = item_enc.indices.to_numpy(zero_copy_only=False).astype(np.int64)
+    correct = table["is_correct"].to_numpy().astype(np.float64)
+
+    n_items = len(item_enc.dictionary)
+    _, first = np.unique(users * n_items + items, return_index=True)
+    return (
+        user_enc.dictionary.to_pylist(),
+        item_enc.dictionary.to_pylist(),
+        users[first],
+        items[first],
+        correct[first],
+    )
+
+
+def classical_stats(users, items, correct, n_users, n_items):
+    """
+    Per-question attempt count, p-value (proportion correct) and point-biserial
+    discrimination against the user's rest score (proportion correct on other items).
+    """
+    n_i = np.bincount(items, minlength=n_items).astype(np.float64)
+    c_i = np.bincount(items, weights=correct, minlength=n_items)
+    n_u = np.bincount(users, minlength=n_users).astype(np.float64)
+    c_u = np.bincount(users, weights=correct, minlength=n_users)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_value = c_i / n_i
+
+        others = n_u[users] - 1
+        has_rest = others > 0
+        rest = np.where(has_rest, (c_u[users] - correct) / np.maximum(others, 1), 0.0)
+        x = np.where(has_rest, correct, 0.0)
+        w = has_rest.astype(np.float64)
+
+        n = np.bincount(items, weights=w, minlength=n_items)
+        sx = np.bincount(items, weights=x, minlength=n_items)
+        sy = np.bincount(items, weights=rest * w, minlength=n_items)
+        syy = np.bincount(items, weights=rest * rest * w, minlength=n_items)
+        sxy = np.bincount(items, weights=x * rest, minlength=n_items)
+
+        # x is 0/1, so sum(x^2) == sum(x)
+        cov = n * sxy - sx * sy
+        var = (n * sx - sx * sx) * (n * syy - sy * sy)
+        discrimination = np.where(var > 0, cov / np.sqrt(var), np.nan)
+
+    return n_i, p_value, discrimination
+
+
+def _extreme_responses(users, items, correct, n_users, n_items):
+    """
+    Mask of responses to drop before a JML fit: users or items with all-correct
+    or all-wrong scores have no finite estimate. Dropping them can make other
+    users or items extreme, so this repeats until nothing changes.
+    """
+    drop = np.zeros(len(correct), dtype=bool)
+    while True:
+        keep = (~drop).astype(np.float64)
+        n_u = np.bincount(users, weights=keep, minlength=n_users)
+        c_u = np.bincount(users, weights=correct * keep, minlength=n_users)
+        n_i = np.bincount(items, weights=keep, minlength=n_items)
+        c_i = np.bincount(items, weights=correct * keep, minlength=n_items)
+        extreme_u = (n_u > 0) & ((c_u == 0) | (c_u == n_u))
+        extreme_i = (n_i > 0) & ((c_i == 0) | (c_i == n_i))
+        newly = ~drop & (extreme_u[users] | extreme_i[items])
+        if not newly.any():
+            return drop
+        drop |= newly
+
+
+def fit_rasch(users, items, correct, n_users, n_items, theta=None, b=None):
+    """
+    Joint maximum-likelihood Rasch fit, P(correct) = sigmoid(theta_u - b_i).
+    Alternates one Newton step for abilities and one for difficulties per
+    iteration; pass previous theta/b to warm-start. Extreme scorers are left
+    out of the fit and pinned at +/-LOGIT_CLIP. Fitted item difficulties are
+    centred on zero.
+    """
+    theta = np.zeros(n_users) if theta is None else theta.astype(np.float64).copy()
+    b = np.zeros(n_items) if b is None else b.astype(np.float64).copy()
+
+    keep = ~_extreme_responses(users, items, correct, n_users, n_items)
+    fit_users, fit_items, fit_correct = users[keep], items[keep], correct[keep]
+    fitted_i = np.bincount(fit_items, minlength=n_items) > 0
+    c_u = np.bincount(fit_users, weights=fit_correct, minlength=n_users)
+    c_i = np.bincount(fit_items, weights=fit_correct, minlength=n_items)
+
+    iteration = -1
+    for iteration in range(MAX_ITER if keep.any() else 0):
+        p = 1.0 / (1.0 + np.exp(b[fit_items] - theta[fit_users]))
+        info = p * (1.0 - p)
+        grad_u = c_u - np.bincount(fit_users, weights=p, minlength=n_users)
+        info_u = np.bincount(fit_users, weights=info, minlength=n_users)
+        step_u = np.divide(grad_u, info_u, out=np.zeros(n_users), where=info_u > 0)
+        theta = np.clip(theta + step_u, -LOGIT_CLIP, LOGIT_CLIP)
+
+        p = 1.0 / (1.0 + np.exp(b[fit_items] - theta[fit_users]))
+        info = p * (1.0 - p)
+        grad_i = c_i - np.bincount(fit_items, weights=p, minlength=n_items)
+        info_i = np.bincount(fit_items, weights=info, minlength=n_items)
+        step_i = np.divide(grad_i, info_i, out=np.zeros(n_items), where=info_i > 0)
+        b = np.clip(b - step_i, -LOGIT_CLIP, LOGIT_CLIP)
+        b[fitted_i] -= b[fitted_i].mean()
+
+        if max(np.abs(step_u).max(initial=0), np.abs(step_i).max(initial=0)) < TOL:
+            break
+
+    # Users and items outside the fit get the bound matching their raw score
+    n_u = np.bincount(users, minlength=n_users)
+    raw_u = np.bincount(users, weights=correct, minlength=n_users)
+    n_i = np.bincount(items, minlength=n_items)
+    raw_i = np.bincount(items, weights=correct, minlength=n_items)
+    theta[(n_u > 0) & (raw_u == n_u)] = LOGIT_CLIP
+    theta[(n_u > 0) & (raw_u == 0)] = -LOGIT_CLIP
+    b[(n_i > 0) & (raw_i == n_i)] = -LOGIT_CLIP
+    b[(n_i > 0) & (raw_i == 0)] = LOGIT_CLIP
+
+    return theta, b, iteration + 1
+
+
+def difficulty_label(b: float) -> str:
+    if b < EASY_BELOW:
+        return "easy"
+    if b > HARD_ABOVE:
+        return "hard"
+    return "medium"
+
+
+def _load_previous(state_dir: str):
+    path = os.path.join(state_dir, "rasch.npz")
+    if not os.path.exists(path):
+        return None
+    prev = np.load(path, allow_pickle=False)
+    return {
+        "user_ids": prev["user_ids"].tolist(),
+        "theta": prev["theta"],
+        "quiz_ids": prev["quiz_ids"].tolist(),
+        "b": prev["b"],
+        "labels": dict(zip(prev["quiz_ids"].tolist(), prev["labels"].tolist())),
+    }
+
+
+def _align(ids: list, prev_ids: list, prev_values):
+    """Map previous parameters onto the current index order (0 for new ids)."""
+    lookup = dict(zip(prev_ids, prev_values))
+    return np.array([lookup.get(i, 0.0) for i in ids], dtype=np.float64)
+
+
+def run_item_analysis(snapshot_dir: str = SNAPSHOT_DIR, state_dir: str = STATE_DIR,
+                      write_back: bool = True) -> dict:
+    """
+    Refresh the snapshot, recompute item statistics and write calibrated
+    difficulty back to Supabase. Re-runs are incremental: nothing is recomputed
+    if no attempts arrived since the last run, the Rasch fit is warm-started from
+    the saved parameters, and only quizzes whose label changed are updated.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    export_snapshot(snapshot_dir)
+    watermark = read_state(snapshot_dir).get("last_answered_at")
+
+    meta_path = os.path.join(state_dir, "state.json")
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    if watermark and meta.get("last_answered_at") == watermark:
+        print("Item analysis up to date at", watermark)
+        return meta
+
+    table = load_attempts(["user_id", "quiz_id", "is_correct", "answered_at"],
+                          snapshot_dir=snapshot_dir)
+    table = table.filter(pc.and_(pc.is_valid(table["user_id"]), pc.is_valid(table["quiz_id"])))
+    user_ids, quiz_ids, users, items, correct = build_matrix(table)
+    n_users, n_items = len(user_ids), len(quiz_ids)
+    if not n_items:
+        print("Item analysis: no attempts to analyse")
+        return meta
+
+    prev = _load_previous(state_dir)
+    theta0 = b0 = None
+    prev_labels = {}
+    if prev:
+        theta0 = _align(user_ids, prev["user_ids"], prev["theta"])
+        b0 = _align(quiz_ids, prev["quiz_ids"], prev["b"])
+        prev_labels = prev["labels"]
+
+    n_i, p_value, discrimination = classical_stats(users, items, correct, n_users, n_items)
+    theta, b, iterations = fit_rasch(users, items, correct, n_users, n_items, theta0, b0)
+
+    labels = []
+    stats_rows = []
+    changed = []
+    for idx, quiz_id in enumerate(quiz_ids):
+        calibrated = n_i[idx] >= MIN_ATTEMPTS
+        label = difficulty_label(b[idx]) if calibrated else ""
+        labels.append(label)
+        if not calibrated:
+            continue
+        stats_rows.append({
+            "quiz_id": quiz_id,
+            "attempts": int(n_i[idx]),
+            "p_value": round(float(p_value[idx]), 4),
+            "discrimination": None if np.isnan(discrimination[idx]) else round(float(discrimination[idx]), 4),
+            "rasch_difficulty": round(float(b[idx]), 4),
+            "difficulty": label,
+            "calibrated_at": datetime.now(timezone.utc).isoformat(),
+        })
+        if prev_labels.get(quiz_id) != label:
+            changed.append((quiz_id, label))
+
+    meta = {
+        "last_answered_at": watermark,
+        "users": n_users,
+        "questions": n_items,
+        "responses": int(len(correct)),
+        "calibrated": len(stats_rows),
+        "relabelled": len(changed),
+        "iterations": iterations,
+    }
+    if not write_back:
+        # Dry run: leave the saved state alone so the next real run still
+        # sees these attempts as new and writes the labels.
+        print("Item analysis (dry run):", meta)
+        return meta
+
+    save_item_stats(stats_rows)
+    for quiz_id, label in changed:
+        update_quiz_difficulty(quiz_id, label)
+
+    np.savez_compressed(
+        os.path.join(state_dir, "rasch.npz"),
+        user_ids=np.array(user_ids, dtype=str),
+        theta=theta,
+        quiz_ids=np.array(quiz_ids, dtype=str),
+        b=b,
+        labels=np.array(labels, dtype=str),
+    )
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    print("Item analysis:", meta)
+    return meta
+
+
+if __name__ == "__main__":
+    run_item_analysis()
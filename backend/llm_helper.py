@@ -1,6 +1,7 @@
 import requests
 import json
 from typing import List, Optional
+from backend import llm_transport
 
 # DeepSeek AI API configuration
 DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
@@ -40,8 +41,10 @@ def generate_roleplay_chat_response(
 回复：
 """
 
-        # For now, return a simple response since we don't have the actual API key
-        # In a real implementation, this would call the DeepSeek API
+        if llm_transport.enabled():
+            return llm_transport.complete(prompt)
+
+        # Without a configured transport, return a canned response
         if "food safety" in topic.lower() or "食品安全" in user_message:
             return "好的，让我们来测试你的食品安全处理技能。请描述一下，如果发现厨房里有食材变质的情况，你会如何处理？"
         elif "customer service" in topic.lower() or "客户服务" in user_message:
@@ -49,6 +52,9 @@ def generate_roleplay_chat_response(
         else:
             return f"欢迎来到{topic}技能测试！请告诉我你想要测试的具体方面，我会为你提供相应的测试场景和指导。"
 
+    except llm_transport.TransportError:
+        # Let callers (routers, scheduler stats) see failed LLM calls
+        raise
     except Exception as e:
         return f"抱歉，我遇到了一些问题：{str(e)}。请稍后再试。"
 
@@ -75,6 +81,9 @@ def generate_roleplay_scenario_feedback(
 用中文回复，每部分用2-3句话。
 """
 
+        if llm_transport.enabled():
+            return llm_transport.complete(prompt)
+
         # Simple feedback response
         return f"""
 **优点认可：** 你的回应显示了良好的问题意识，能够识别场景中的关键问题。
@@ -84,6 +93,8 @@ def generate_roleplay_scenario_feedback(
 **具体行动建议：** 建议在实际工作中多练习类似场景，并记录处理经验以便改进。
 """
 
+    except llm_transport.TransportError:
+        raise
     except Exception as e:
         return f"抱歉，评估过程中遇到问题：{str(e)}"
 
@@ -96,6 +107,17 @@ def generate_ai_questions(
     Generate AI test questions
     """
     try:
+        if llm_transport.enabled():
+            prompt = f"""
+你是一个专业的餐厅技能培训出题专家。请围绕主题"{topic}"出{count}道{difficulty}难度的测试题。
+
+只返回JSON数组，每个元素包含字段：sop_topic, question, type, options, answer, tags, explanation。
+"""
+            questions = _parse_json_list(llm_transport.complete(prompt))
+            for i, q in enumerate(questions):
+                q.setdefault("id", i + 1)
+            return questions
+
         questions = []
         for i in range(count):
             questions.append({
@@ -109,6 +131,8 @@ def generate_ai_questions(
                 "explanation": f"这是关于{topic}的详细解释"
             })
         return questions
+    except llm_transport.TransportError:
+        raise
     except Exception as e:
         return []
 
@@ -135,7 +159,37 @@ def generate_ai_tutor_response(
 用中文回复，保持专业和鼓励的语调。
 """
 
+        if llm_transport.enabled():
+            return llm_transport.complete(prompt)
+
         return f"关于你的问题'{user_question}'，我建议你从{topic}的基础知识开始，然后逐步深入。建议多进行实践练习，这样能更好地掌握相关技能。"
 
+    except llm_transport.TransportError:
+        raise
     except Exception as e:
         return f"抱歉，我无法回答这个问题：{str(e)}"
+
+def _parse_json_list(text: str) -> List[dict]:
+    """
+    Extract the JSON array from a model reply (tolerates ```json fences).
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end == -1:
+        return []
+    return json.loads(text[start:end + 1])
+
+def generate_quiz_from_sop(sop_text: str) -> List[dict]:
+    """
+    Generate quiz items (QuizItem shape) from an SOP document
+    """
+    prompt = f"""
+You are a restaurant training designer. Write quiz questions that test the key
+facts in the SOP below. Return only a JSON array; each item has the fields
+sop_topic, question, options (list, empty for fill_blank), answer,
+type ("choice" or "fill_blank"), difficulty ("easy", "medium" or "hard"),
+source_text (the SOP sentence the answer comes from) and tags (list).
+
+SOP:
+{sop_text}
+"""
+    return _parse_json_list(llm_transport.complete(prompt))
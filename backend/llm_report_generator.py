@@ -1,6 +1,8 @@
-from db import get_user_report, save_user_report_to_db,get_user_submissions
+from backend.db import get_user_report, save_user_report_to_db,get_user_submissions,get_user_topic_history
 from openai import OpenAI
 import os
+from backend import llm_transport
+from backend.llm_scheduler import run_batch
 
 def format_quiz_history(data: list) -> str:
     formatted_attempts = []
@@ -28,6 +30,22 @@ def format_quiz_history(data: list) -> str:
         formatted_attempts.append(formatted.strip())
     return formatted_attempts
 
+def format_topic_history(rollups: list) -> list:
+    """
+    Older history that retention compacted, as one line per topic with its
+    monthly accuracy (newest month first).
+    """
+    by_topic = {}
+    for rollup in rollups:
+        by_topic.setdefault(rollup['sop_topic'], []).append(rollup)
+    formatted = []
+    for topic, months in by_topic.items():
+        trend = ", ".join(
+            f"{m['month']}: {m['correct']}/{m['attempts']}" for m in months
+        )
+        formatted.append(f"=== {topic} (compacted, correct/attempts per month) ===\n{trend}")
+    return formatted
+
 def generate_llm_prompt(formatted_history: str, user_name: str) -> str:
     """
     Creates a complete LLM prompt with instructions for analysis.
@@ -60,11 +78,16 @@ Write in professional business English, using bullet points for clarity.
 
 def generate_user_report(user_id: str):
     submissions = get_user_submissions(user_id)
-    submissions = format_quiz_history(submissions)
+    submissions = format_quiz_history(submissions) + format_topic_history(get_user_topic_history(user_id))
     submission_str = "\n".join(submissions)
     prompt = generate_llm_prompt(submission_str,user_id)
     print(prompt)
-    
+
+    if llm_transport.enabled():
+        report = run_batch(llm_transport.complete, prompt, user_id=user_id)
+        save_user_report_to_db(user_id=user_id, summary=report)
+        return report
+
     report = """
     Employee Training Analysis Report
 Employee ID: d33b2c44-baaa-4e43-b532-e82ecbe405d6
@@ -0,0 +1,311 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from functools import partial
+
+from backend import cache
+
+# Admission control in front of LLM calls. Every call goes through
+# scheduler.submit(): it is rate limited per user and per store (token
+# buckets), queued by priority class, shed if it cannot start before its
+# deadline, and run in a worker thread once one of the LLM slots is free.
+#
+# Under gunicorn every worker has its own scheduler: from_env() splits
+# LLM_CONCURRENCY between the workers and keeps the buckets in the shared
+# cache file so the per-user and per-store rates hold for the whole box.
+INTERACTIVE = 0
+BATCH = 1
+CLASS_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+SWEEP_SECONDS = 60
+
+
+class AdmissionError(Exception):
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimited(AdmissionError):
+    pass
+
+
+class Shed(AdmissionError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """
+        Take one token now, letting the balance go negative, and return the
+        seconds until that token is covered. Concurrent callers therefore
+        queue up behind each other instead of all seeing the same free token.
+        """
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def idle(self, now: float) -> bool:
+        """Full again, i.e. unused for at least capacity / rate seconds."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class SharedTokenBucket:
+    """TokenBucket whose balance lives in the cache file shared by all workers."""
+
+    def __init__(self, key: str, rate: float, capacity: float):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+
+    def reserve(self, now: float) -> float:
+        return cache.take_token(self.key, self.rate, self.capacity)
+
+    def refund(self):
+        cache.return_token(self.key)
+
+    def idle(self, now: float) -> bool:
+        return cache.drop_full_bucket(self.key)
+
+
+class _Request:
+    __slots__ = ("priority", "deadline", "enqueued", "started")
+
+    def __init__(self, priority: int, deadline: float, started: asyncio.Future):
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.started = started
+
+
+class _ClassStats:
+    def __init__(self):
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+        self.rate_limited = 0
+        self.waits = deque(maxlen=2000)
+        self.service = deque(maxlen=200)
+
+    def snapshot(self) -> dict:
+        waits = sorted(self.waits)
+
+        def pct(q):
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1)
+
+        return {
+            "queue_depth": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "shed": self.shed,
+            "rate_limited": self.rate_limited,
+            "wait_ms": {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99)},
+        }
+
+
+class LLMScheduler:
+    def __init__(self, concurrency: int = 4, interactive_reserve: int = 1,
+                 user_rate: float = 1.0, user_burst: float = 5,
+                 store_rate: float = 5.0, store_burst: float = 20,
+                 deadlines: dict = None, shared_buckets: bool = False):
+        self.concurrency = concurrency
+        # Slots batch work may never take, so an interactive turn never waits
+        # behind a full slate of long batch calls.
+        self.interactive_reserve = min(interactive_reserve, concurrency - 1)
+        self.user_rate, self.user_burst = user_rate, user_burst
+        self.store_rate, self.store_burst = store_rate, store_burst
+        self.deadlines = deadlines or {INTERACTIVE: 15.0, BATCH: 600.0}
+        self._bucket = SharedTokenBucket if shared_buckets else self._local_bucket
+        self._heap = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._user_buckets = {}
+        self._store_buckets = {}
+        # Callers that identify neither user nor store share one store-sized
+        # bucket rather than bypassing rate limiting.
+        self._anonymous_bucket = self._bucket("anonymous", store_rate, store_burst)
+        self._swept = time.monotonic()
+        self._stats = {p: _ClassStats() for p in CLASS_NAMES}
+
+    @staticmethod
+    def _local_bucket(key: str, rate: float, capacity: float) -> TokenBucket:
+        return TokenBucket(rate, capacity)
+
+    @classmethod
+    def from_env(cls):
+        # LLM_CONCURRENCY is the budget of the whole box (start.sh exports WORKERS)
+        workers = max(1, int(os.getenv("WORKERS", "1")))
+        return cls(
+            concurrency=max(1, int(os.getenv("LLM_CONCURRENCY", "4")) // workers),
+            interactive_reserve=int(os.getenv("LLM_INTERACTIVE_RESERVE", "1")),
+            user_rate=float(os.getenv("LLM_USER_RATE", "1.0")),
+            user_burst=float(os.getenv("LLM_USER_BURST", "5")),
+            store_rate=float(os.getenv("LLM_STORE_RATE", "5.0")),
+            store_burst=float(os.getenv("LLM_STORE_BURST", "20")),
+            deadlines={
+                INTERACTIVE: float(os.getenv("LLM_INTERACTIVE_DEADLINE", "15")),
+                BATCH: float(os.getenv("LLM_BATCH_DEADLINE", "600")),
+            },
+            shared_buckets=workers > 1,
+        )
+
+    def _sweep(self, now: float):
+        """Drop buckets that are full again; a fresh bucket behaves the same."""
+        if now - self._swept < SWEEP_SECONDS:
+            return
+        self._swept = now
+        for buckets in (self._user_buckets, self._store_buckets):
+            for key in [k for k, b in buckets.items() if b.idle(now)]:
+                del buckets[key]
+
+    def _buckets_for(self, user_id, store_id):
+        self._sweep(time.monotonic())
+        buckets = []
+        if user_id:
+            if user_id not in self._user_buckets:
+                self._user_buckets[user_id] = self._bucket(f"user:{user_id}", self.user_rate, self.user_burst)
+            buckets.append(self._user_buckets[user_id])
+        if store_id:
+            if store_id not in self._store_buckets:
+                self._store_buckets[store_id] = self._bucket(f"store:{store_id}", self.store_rate, self.store_burst)
+            buckets.append(self._store_buckets[store_id])
+        return buckets or [self._anonymous_bucket]
+
+    def _estimated_wait(self, priority: int) -> float:
+        """Rough queueing delay: work ahead of us spread over the usable slots."""
+        service = [s for p in CLASS_NAMES for s in self._stats[p].service]
+        if not service:
+            return 0.0
+        avg = sum(service) / len(service)
+        ahead = sum(1 for r in self._heap if r[0] <= priority) + self._running
+        slots = self.concurrency if priority == INTERACTIVE else self.concurrency - self.interactive_reserve
+        return max(0.0, (ahead + 1 - slots)) * avg / max(slots, 1)
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while self._heap:
+            priority, _, req = self._heap[0]
+            if req.started.done():  # caller went away while queued
+                heapq.heappop(self._heap)
+                self._stats[priority].queued -= 1
+                continue
+            if req.deadline <= now:
+                heapq.heappop(self._heap)
+                self._stats[priority].queued -= 1
+                self._stats[priority].shed += 1
+                req.started.set_exception(Shed("LLM request expired in queue"))
+                continue
+            free = self.concurrency - self._running
+            if free <= 0 or (priority == BATCH and free <= self.interactive_reserve):
+                break
+            heapq.heappop(self._heap)
+            self._running += 1
+            stats = self._stats[priority]
+            stats.queued -= 1
+            stats.running += 1
+            stats.waits.append(now - req.enqueued)
+            req.started.set_result(None)
+
+    async def submit(self, fn, *args, priority: int = INTERACTIVE, user_id: str = None,
+                     store_id: str = None, deadline: float = None, **kwargs):
+        """
+        Run fn(*args, **kwargs) in a worker thread once admitted. `deadline` is
+        seconds from now by which the call must have started (defaults per class).
+        Raises RateLimited or Shed instead of queueing work that would be late.
+        """
+        loop = asyncio.get_running_loop()
+        stats = self._stats[priority]
+        budget = self.deadlines[priority] if deadline is None else deadline
+        now = time.monotonic()
+        expires = now + budget
+
+        # Tokens are taken at admission; the wait is the deficit this call
+        # leaves in its slowest bucket.
+        buckets = self._buckets_for(user_id, store_id)
+        wait = max([b.reserve(now) for b in buckets])
+        if wait > budget:
+            self._refund(buckets)
+            stats.rate_limited += 1
+            raise RateLimited("LLM rate limit exceeded", retry_after=wait)
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._refund(buckets)
+                raise
+
+        estimate = self._estimated_wait(priority)
+        if time.monotonic() + estimate > expires:
+            # Shed for lack of capacity, not for the caller's rate: give the tokens back
+            self._refund(buckets)
+            stats.shed += 1
+            raise Shed("LLM capacity exhausted", retry_after=estimate)
+
+        req = _Request(priority, expires, loop.create_future())
+        heapq.heappush(self._heap, (priority, next(self._seq), req))
+        stats.queued += 1
+        self._dispatch()
+        try:
+            await req.started
+        except asyncio.CancelledError:
+            # Cancelled right after a slot was granted: hand the slot back
+            if not req.started.cancelled() and req.started.exception() is None:
+                self._release(stats)
+            raise
+
+        started = time.monotonic()
+        try:
+            return await loop.run_in_executor(None, partial(fn, *args, **kwargs))
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            stats.service.append(time.monotonic() - started)
+            stats.completed += 1
+            self._release(stats)
+
+    @staticmethod
+    def _refund(buckets: list):
+        for b in buckets:
+            b.refund()
+
+    def _release(self, stats: _ClassStats):
+        stats.running -= 1
+        self._running -= 1
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "running": self._running,
+            "classes": {name: self._stats[p].snapshot() for p, name in CLASS_NAMES.items()},
+        }
+
+
+scheduler = LLMScheduler.from_env()
+
+
+def run_batch(fn, *args, **kwargs):
+    """Synchronous entry point for scripts (report / quiz generation)."""
+    return asyncio.run(scheduler.submit(fn, *args, priority=BATCH, **kwargs))
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+# Pluggable transport behind every LLM call (DeepSeek, OpenAI-compatible API).
+#   LLM_TRANSPORT=live    call the API
+#   LLM_TRANSPORT=record  call the API and append request/response, latency and
+#                         token usage to LLM_RECORD_PATH (JSONL)
+#   LLM_TRANSPORT=replay  answer from LLM_RECORD_PATH without network, sleeping
+#                         the recorded latency x LLM_REPLAY_LATENCY_SCALE
+#                         (LLM_REPLAY_LATENCY=none to skip the sleep)
+# Unset: no transport, llm_helper keeps returning its canned responses.
+DEFAULT_MODEL = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+DEFAULT_RECORD_PATH = "data/llm_recordings.jsonl"
+
+
+class TransportError(Exception):
+    """The LLM call itself failed (network, HTTP status, missing recording)."""
+
+
+class ReplayMiss(TransportError, KeyError):
+    pass
+
+
+def request_key(payload: dict) -> str:
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_ms = 0.0
+
+    def add(self, result: dict):
+        usage = result.get("usage") or {}
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+            self.latency_ms += result["latency_ms"]
+
+    def error(self):
+        with self.lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "avg_latency_ms": round(self.latency_ms / self.calls, 1) if self.calls else None,
+        }
+
+
+class LiveTransport:
+    mode = "live"
+
+    def __init__(self, api_url: str = None, api_key: str = None, timeout: float = 60):
+        self.api_url = api_url or os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
+        self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
+        self.timeout = timeout
+        self.stats = _Stats()
+
+    def send(self, payload: dict) -> dict:
+        start = time.perf_counter()
+        try:
+            resp = requests.post(
+                self.api_url,
+                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+                json=payload,
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            body = resp.json()
+            content = body["choices"][0]["message"]["content"]
+        except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+            self.stats.error()
+            raise TransportError(f"LLM API call failed: {e}") from e
+        result = {
+            "content": content,
+            "usage": body.get("usage") or {},
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        self.stats.add(result)
+        return result
+
+
+class RecordTransport:
+    mode = "record"
+
+    def __init__(self, path: str, inner: LiveTransport = None):
+        self.path = path
+        self.inner = inner or LiveTransport()
+        self.stats = self.inner.stats
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def send(self, payload: dict) -> dict:
+        result = self.inner.send(payload)
+        record = {
+            "key": request_key(payload),
+            "request": payload,
+            "response": {"content": result["content"], "usage": result["usage"]},
+            "latency_ms": result["latency_ms"],
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return result
+
+
+class ReplayTransport:
+    mode = "replay"
+
+    def __init__(self, path: str, latency: str = "recorded", latency_scale: float = 1.0):
+        self.path = path
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.stats = _Stats()
+        self._lock = threading.Lock()
+        self._records = {}
+        self._cursor = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records.setdefault(record["key"], []).append(record)
+
+    def send(self, payload: dict) -> dict:
+        key = request_key(payload)
+        records = self._records.get(key)
+        if not records:
+            self.stats.error()
+            raise ReplayMiss(f"No recording for request {key[:12]} in {self.path}")
+        # Identical requests replay their recordings in order, then cycle
+        with self._lock:
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = i + 1
+        record = records[i % len(records)]
+
+        latency_ms = record["latency_ms"] * self.latency_scale if self.latency == "recorded" else 0.0
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        result = {**record["response"], "latency_ms": round(latency_ms, 1)}
+        self.stats.add(result)
+        return result
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def configure(mode: str = None, path: str = None, latency: str = None, latency_scale: float = None):
+    """
+    Select the transport explicitly (benchmarks, scripts); arguments default to
+    the LLM_* environment variables. mode=None disables the transport.
+    """
+    global _transport
+    mode = mode if mode is not None else os.getenv("LLM_TRANSPORT")
+    path = path or os.getenv("LLM_RECORD_PATH", DEFAULT_RECORD_PATH)
+    with _transport_lock:
+        if not mode:
+            _transport = False
+        elif mode == "live":
+            _transport = LiveTransport()
+        elif mode == "record":
+            _transport = RecordTransport(path)
+        elif mode == "replay":
+            _transport = ReplayTransport(
+                path,
+                latency=latency or os.getenv("LLM_REPLAY_LATENCY", "recorded"),
+                latency_scale=latency_scale if latency_scale is not None
+                else float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0")),
+            )
+        else:
+            raise ValueError(f"Unknown LLM_TRANSPORT: {mode}")
+    return _transport
+
+
+def get_transport():
+    if _transport is None:
+        configure()
+    return _transport or None
+
+
+def enabled() -> bool:
+    return get_transport() is not None
+
+
+def complete(prompt: str, system: str = None, model: str = None, **params) -> str:
+    """
+    Send one chat completion through the configured transport and return the text.
+    """
+    transport = get_transport()
+    if transport is None:
+        raise RuntimeError("No LLM transport configured (set LLM_TRANSPORT)")
+    messages = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    payload = {"model": model or DEFAULT_MODEL, "messages": messages, **params}
+    return transport.send(payload)["content"]
+
+
+def stats() -> dict:
+    transport = get_transport()
+    if transport is None:
+        return {"mode": None}
+    return {"mode": transport.mode, **transport.stats.snapshot()}
@@ -0,0 +1,222 @@
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+
+# In-memory stand-in for the subset of the Supabase client that db.py uses.
+# Selected with LERNA_STORAGE=local (benchmarks, offline development).
+# Embedded selects such as "quizzes ( question )" resolve through
+# FOREIGN_KEYS; upserts conflict on PRIMARY_KEYS (default "id").
+FOREIGN_KEYS = {"quizzes": "quiz_id", "users": "user_id"}
+PRIMARY_KEYS = {
+    "user_reports": "user_id",
+    "quiz_item_stats": "quiz_id",
+    "quiz_attempt_rollups": "user_id,quiz_id,day",
+    "quiz_topic_rollups": "user_id,sop_topic,month",
+}
+_EMBED = re.compile(r"(\w+)\s*\(([^)]*)\)")
+
+
+class LocalStoreError(Exception):
+    pass
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _parse_columns(spec: str):
+    embedded = {name: [c.strip() for c in cols.split(",") if c.strip()]
+                for name, cols in _EMBED.findall(spec)}
+    plain = [c.strip() for c in _EMBED.sub("", spec).split(",") if c.strip()]
+    return plain, embedded
+
+
+class _Query:
+    def __init__(self, store, table: str):
+        self.store = store
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.window = None
+        self.one = False
+        self.on_conflict = None
+        self.ignore_duplicates = False
+
+    # --- actions -----------------------------------------------------------
+    def select(self, columns: str = "*"):
+        self.action, self.columns = "select", columns
+        return self
+
+    def insert(self, data):
+        self.action, self.payload = "insert", data
+        return self
+
+    def upsert(self, data, on_conflict: str = None, ignore_duplicates: bool = False):
+        self.action, self.payload = "upsert", data
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, data: dict):
+        self.action, self.payload = "update", data
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # --- modifiers ---------------------------------------------------------
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r[column] > value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r[column] >= value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r[column] < value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r[column] <= value)
+        return self
+
+    def order(self, column, desc: bool = False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int):
+        self.window = (0, count - 1)
+        return self
+
+    def range(self, start: int, end: int):
+        self.window = (start, end)
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    def execute(self):
+        with self.store.lock:
+            return getattr(self, "_" + self.action)()
+
+    # --- execution ---------------------------------------------------------
+    def _matching(self):
+        rows = self.store.tables.setdefault(self.table, [])
+        return [r for r in rows if all(f(r) for f in self.filters)]
+
+    def _select(self):
+        rows = self._matching()
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if self.window:
+            rows = rows[self.window[0]:self.window[1] + 1]
+
+        plain, embedded = _parse_columns(self.columns)
+        out = []
+        for r in rows:
+            item = dict(r) if "*" in plain or not plain else {c: r.get(c) for c in plain}
+            for name, cols in embedded.items():
+                ref = self.store.by_id(name, r.get(FOREIGN_KEYS.get(name, name + "_id")))
+                item[name] = None if ref is None else {c: ref.get(c) for c in cols}
+            out.append(item)
+
+        if self.one:
+            if len(out) != 1:
+                raise LocalStoreError(f"{self.table}: expected 1 row, got {len(out)}")
+            return _Result(out[0])
+        return _Result(out)
+
+    def _new_row(self, data: dict) -> dict:
+        row = dict(data)
+        row.setdefault("id", str(uuid.uuid4()))
+        if self.table == "quiz_attempts":
+            row.setdefault("answered_at", _now())
+        return row
+
+    def _insert(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        inserted = [self.store.add(self.table, self._new_row(r)) for r in rows]
+        return _Result(inserted)
+
+    def _upsert(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        columns = (self.on_conflict or PRIMARY_KEYS.get(self.table, "id")).split(",")
+
+        def key(r):
+            return tuple(r.get(c.strip()) for c in columns)
+
+        table = self.store.tables.setdefault(self.table, [])
+        existing = {key(r): r for r in table if None not in key(r)}
+        out = []
+        for data in rows:
+            current = existing.get(key(data))
+            if current is None:
+                out.append(self.store.add(self.table, self._new_row(data)))
+                existing[key(data)] = out[-1]
+            elif not self.ignore_duplicates:
+                current.update(data)
+                out.append(current)
+        return _Result(out)
+
+    def _update(self):
+        rows = self._matching()
+        for r in rows:
+            r.update(self.payload)
+        return _Result(rows)
+
+    def _delete(self):
+        doomed = self._matching()
+        ids = {id(r) for r in doomed}
+        self.store.tables[self.table] = [r for r in self.store.tables[self.table] if id(r) not in ids]
+        for r in doomed:
+            self.store.ids.get(self.table, {}).pop(r.get("id"), None)
+        return _Result(doomed)
+
+
+class LocalClient:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.ids = {}
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def add(self, table: str, row: dict) -> dict:
+        self.tables.setdefault(table, []).append(row)
+        self.ids.setdefault(table, {})[row.get("id")] = row
+        return row
+
+    def by_id(self, table: str, row_id):
+        return self.ids.get(table, {}).get(row_id)
+
+    def load(self, table: str, rows: list):
+        """Bulk-load rows (used by the synthetic data generator)."""
+        with self.lock:
+            for r in rows:
+                self.add(table, r)
+
+    def reset(self):
+        with self.lock:
+            self.tables.clear()
+            self.ids.clear()
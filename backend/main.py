@@ -1,9 +1,14 @@
 from fastapi import FastAPI
 from backend.routers import quiz, auth, progress, employee, manager, ai_training
+from backend.http_cache import add_compression, conditional_get
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI()
 
+# Innermost first: compress, then ETag the encoded body, CORS outermost so 304s carry CORS headers
+add_compression(app)
+app.middleware("http")(conditional_get)
+
 # Allow frontend
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,15 @@
+-- Schema changes on top of the Supabase tables (users, quizzes, quiz_attempts,
+-- user_reports). Apply the files in order, e.g. in the Supabase SQL editor or
+-- with psql "$DATABASE_URL" -f <file>; each one can be re-run safely.
+
+-- Calibrated per-question statistics written by item_analysis.py
+-- (db.save_item_stats upserts on quiz_id).
+create table if not exists quiz_item_stats (
+    quiz_id          uuid primary key references quizzes (id) on delete cascade,
+    attempts         integer not null,
+    p_value          double precision not null,
+    discrimination   double precision,
+    rasch_difficulty double precision not null,
+    difficulty       text not null,
+    calibrated_at    timestamptz not null default now()
+);
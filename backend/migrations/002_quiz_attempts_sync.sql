@@ -0,0 +1,15 @@
+-- Attempts uploaded by store clients (POST /employee/sync, db.save_quiz_attempts).
+-- client_attempt_id makes re-uploads idempotent: the upsert conflicts on it,
+-- which needs a plain (non-partial) unique constraint. Attempts submitted
+-- online leave it null, and nulls never conflict.
+alter table quiz_attempts add column if not exists client_attempt_id text;
+alter table quiz_attempts add column if not exists client_answered_at timestamptz;
+
+do $$
+begin
+    if not exists (select 1 from pg_constraint where conname = 'quiz_attempts_client_attempt_id_key') then
+        alter table quiz_attempts
+            add constraint quiz_attempts_client_attempt_id_key unique (client_attempt_id);
+    end if;
+end
+$$;
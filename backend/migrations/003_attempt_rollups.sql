@@ -0,0 +1,28 @@
+-- Compacted history written by retention.py before raw quiz_attempts rows
+-- past the retention window are deleted. The unique keys are the on_conflict
+-- targets of db.save_attempt_rollups / db.save_topic_rollups, so repeated
+-- runs overwrite instead of adding up.
+
+-- One row per user, question and day
+create table if not exists quiz_attempt_rollups (
+    user_id           uuid not null references users (id) on delete cascade,
+    quiz_id           uuid not null references quizzes (id) on delete cascade,
+    day               date not null,
+    attempts          integer not null,
+    correct           integer not null,
+    first_answered_at timestamptz not null,
+    last_answered_at  timestamptz not null,
+    last_answer       text,
+    last_is_correct   boolean not null,
+    unique (user_id, quiz_id, day)
+);
+
+-- Per-user, per-topic totals by month ('YYYY-MM'), read by db.get_user_topic_history
+create table if not exists quiz_topic_rollups (
+    user_id   uuid not null references users (id) on delete cascade,
+    sop_topic text not null,
+    month     text not null check (month ~ '^[0-9]{4}-[0-9]{2}$'),
+    attempts  integer not null,
+    correct   integer not null,
+    unique (user_id, sop_topic, month)
+);
@@ -0,0 +1,99 @@
+import hashlib
+import json
+
+from backend import cache
+from backend.db import NORMALIZATION_RULES, get_known_user_ids, get_quizzes, is_correct_answer
+
+# Offline quiz bundles for stores. A bundle holds every question a store client
+# needs to grade locally; its version is a hash over per-question content
+# hashes, so two versions can be diffed question by question. Manifests of
+# served versions are kept in the shared cache ("bundles" is never bumped).
+# Quizzes are not assigned to stores, so bundles are per topic: every store
+# gets the same bundle and store_id is only echoed back as a label.
+BUNDLE_FIELDS = ("id", "sop_topic", "question", "options", "answer", "type", "difficulty", "tags")
+
+
+def _canonical(obj) -> bytes:
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _question_entry(quiz: dict) -> dict:
+    entry = {field: quiz.get(field) for field in BUNDLE_FIELDS}
+    entry["id"] = str(entry["id"])
+    entry["hash"] = hashlib.sha256(_canonical(entry)).hexdigest()[:16]
+    return entry
+
+
+def build_bundle(topic: str = None) -> dict:
+    at = cache.version("quizzes")
+    bundle = cache.get("quizzes", ("bundle", topic))
+    if bundle is not None:
+        return bundle
+    questions = sorted((_question_entry(q) for q in get_quizzes(topic)), key=lambda q: q["id"])
+    manifest = {q["id"]: q["hash"] for q in questions}
+    version = hashlib.sha256(_canonical(sorted(manifest.items()))).hexdigest()[:16]
+    bundle = {"version": version, "questions": questions, "manifest": manifest}
+    cache.put("bundles", ("manifest", topic, version), manifest)
+    cache.put("quizzes", ("bundle", topic), bundle, at_version=at)
+    return bundle
+
+
+def bundle_for(store_id: str = None, topic: str = None, since: str = None) -> dict:
+    """
+    Full bundle, or only what changed when the client already holds `since`.
+    Falls back to a full bundle when `since` is unknown (e.g. evicted).
+    The content depends on `topic` only; `store_id` does not filter it.
+    """
+    bundle = build_bundle(topic)
+    response = {
+        "store_id": store_id,
+        "topic": topic,
+        "version": bundle["version"],
+        "normalization": NORMALIZATION_RULES,
+    }
+    if since == bundle["version"]:
+        return {**response, "delta": True, "base_version": since, "questions": [], "removed": []}
+
+    old = cache.get("bundles", ("manifest", topic, since)) if since else None
+    if old is None:
+        return {**response, "delta": False, "questions": bundle["questions"]}
+
+    manifest = bundle["manifest"]
+    return {
+        **response,
+        "delta": True,
+        "base_version": since,
+        "questions": [q for q in bundle["questions"] if old.get(q["id"]) != q["hash"]],
+        "removed": sorted(set(old) - set(manifest)),
+    }
+
+
+def grade_synced_attempts(attempts: list) -> tuple:
+    """
+    Re-grade attempts uploaded by a store with the same rules as submit_quiz.
+    Returns (rows to insert, per-attempt results, rejected attempt ids);
+    attempts for an unknown quiz or user are rejected.
+    """
+    quizzes = {str(q["id"]): q for q in get_quizzes()}
+    # Unknown users would fail the whole batch insert (foreign key) or, in
+    # the local store, leave rows without a user
+    users = get_known_user_ids(a["user_id"] for a in attempts)
+    rows, results, rejected = [], {}, []
+    for attempt in attempts:
+        quiz = quizzes.get(str(attempt["quiz_id"]))
+        if quiz is None or str(attempt["user_id"]) not in users:
+            rejected.append(attempt["attempt_id"])
+            continue
+        correct = is_correct_answer(attempt["answer"], quiz["answer"])
+        rows.append({
+            "client_attempt_id": attempt["attempt_id"],
+            "user_id": attempt["user_id"],
+            "quiz_id": quiz["id"],
+            "answer": attempt["answer"],
+            "is_correct": correct,
+            # answered_at stays the server insert time so incremental exports
+            # keyed on it never miss late uploads; the store's clock is kept too
+            "client_answered_at": attempt.get("answered_at"),
+        })
+        results[attempt["attempt_id"]] = correct
+    return rows, results, rejected
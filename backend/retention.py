@@ -0,0 +1,127 @@
+import argparse
+import os
+from datetime import datetime, timedelta, timezone
+
+from backend.analytics_snapshot import (
+    accuracy_rollup,
+    export_snapshot,
+    flatten_attempt,
+    parse_timestamp,
+    write_partitioned,
+)
+from backend.db import (
+    delete_attempts_before,
+    get_oldest_attempt_time,
+    get_submissions_since,
+    save_attempt_rollups,
+    save_topic_rollups,
+)
+
+# Retention for quiz_attempts. Raw attempts older than the window are compacted
+# one day at a time, oldest first:
+#   1. raw rows are archived to <ARCHIVE_DIR>/month=YYYY-MM/day-YYYY-MM-DD.parquet
+#      (same layout as the analytics snapshot, so load_attempts() can read it)
+#   2. per-user, per-question, per-day rollups go to quiz_attempt_rollups
+#   3. per-user, per-topic totals of the day's month are recomputed from the
+#      archive into quiz_topic_rollups (bounded history for reports)
+#   4. the raw rows of that day are deleted
+# Every step overwrites rather than appends, so an interrupted run can be repeated.
+RETENTION_DAYS = int(os.getenv("LERNA_RETENTION_DAYS", "180"))
+ARCHIVE_DIR = os.getenv("LERNA_ARCHIVE_DIR", "data/archive/attempts")
+
+
+def rollup_day(rows: list) -> list:
+    """
+    Collapse one day of flattened attempts into one row per (user, question).
+    """
+    groups = {}
+    for r in rows:
+        key = (r["user_id"], r["quiz_id"])
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = {
+                "user_id": r["user_id"],
+                "quiz_id": r["quiz_id"],
+                "day": r["answered_at"].date().isoformat(),
+                "attempts": 0,
+                "correct": 0,
+                "first_answered_at": r["answered_at"],
+                "last_answered_at": r["answered_at"],
+                "last_answer": r["answer"],
+                "last_is_correct": r["is_correct"],
+            }
+        g["attempts"] += 1
+        g["correct"] += int(r["is_correct"])
+        g["first_answered_at"] = min(g["first_answered_at"], r["answered_at"])
+        if r["answered_at"] >= g["last_answered_at"]:
+            g["last_answered_at"] = r["answered_at"]
+            g["last_answer"] = r["answer"]
+            g["last_is_correct"] = r["is_correct"]
+
+    rollups = list(groups.values())
+    for g in rollups:
+        g["first_answered_at"] = g["first_answered_at"].isoformat()
+        g["last_answered_at"] = g["last_answered_at"].isoformat()
+    return rollups
+
+
+def rollup_month(day_start: datetime, archive_dir: str = ARCHIVE_DIR) -> list:
+    """
+    Per-user, per-topic totals for the archived month containing `day_start`.
+    """
+    month_start = day_start.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    table = accuracy_rollup(("user_id", "sop_topic"), month_start, next_month, archive_dir)
+    month = month_start.strftime("%Y-%m")
+    return [
+        {"user_id": r["user_id"], "sop_topic": r["sop_topic"], "month": month,
+         "attempts": r["attempts"], "correct": r["correct"]}
+        for r in table.to_pylist()
+        if r["user_id"] is not None and r["sop_topic"] is not None
+    ]
+
+
+def compact_attempts(retention_days: int = RETENTION_DAYS, archive_dir: str = ARCHIVE_DIR) -> dict:
+    """
+    Compact every raw attempt answered before midnight (UTC) `retention_days` ago.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=retention_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # The analytics snapshot (heatmaps, item analysis) must hold every row
+    # before raw rows disappear from the database.
+    export_snapshot()
+
+    summary = {"cutoff": cutoff.isoformat(), "days": 0, "attempts": 0, "rollups": 0}
+    while True:
+        oldest = get_oldest_attempt_time()
+        if oldest is None:
+            break
+        day_start = parse_timestamp(oldest).replace(hour=0, minute=0, second=0, microsecond=0)
+        if day_start >= cutoff:
+            break
+        day_end = (day_start + timedelta(days=1)).isoformat()
+
+        # Everything before day_end is this day: older days are already compacted
+        rows = [flatten_attempt(r) for r in get_submissions_since(answered_before=day_end)]
+        rollups = rollup_day(rows)
+        write_partitioned(rows, archive_dir, name=f"day-{day_start.date().isoformat()}")
+        save_attempt_rollups(rollups)
+        save_topic_rollups(rollup_month(day_start, archive_dir))
+        delete_attempts_before(day_end)
+
+        summary["days"] += 1
+        summary["attempts"] += len(rows)
+        summary["rollups"] += len(rollups)
+        print(f"Compacted {day_start.date()}: {len(rows)} attempts -> {len(rollups)} rollups")
+
+    print("Retention:", summary)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS)
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    args = parser.parse_args()
+    compact_attempts(args.days, args.archive_dir)
@@ -3,7 +3,9 @@ from pydantic import BaseModel
 from typing import Optional, List
 import requests
 import json
-from ..llm_helper import generate_roleplay_chat_response
+from ..llm_helper import generate_roleplay_chat_response, generate_ai_questions
+from ..llm_scheduler import scheduler, AdmissionError, Shed, INTERACTIVE, BATCH
+from .. import llm_transport
 
 router = APIRouter(prefix="/ai-training", tags=["AI Training"])
 
@@ -12,12 +14,23 @@ class RoleplayChatRequest(BaseModel):
     user_role: str
     conversation_history: Optional[List[dict]] = []
     test_history: Optional[List[dict]] = []
+    user_id: Optional[str] = None
+    store_id: Optional[str] = None
 
 class RoleplayFeedbackRequest(BaseModel):
     scenario_id: str
     user_response: str
     user_role: str
     scenario_history: Optional[List[dict]] = []
+    user_id: Optional[str] = None
+    store_id: Optional[str] = None
+
+def _admission_error(e: AdmissionError):
+    return HTTPException(
+        status_code=503 if isinstance(e, Shed) else 429,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, round(e.retry_after)))},
+    )
 
 @router.post("/roleplay-chat")
 async def roleplay_chat(req: RoleplayChatRequest):
@@ -25,16 +38,22 @@ async def roleplay_chat(req: RoleplayChatRequest):
     AI roleplay chat endpoint for skill testing scenarios
     """
     try:
-        response = generate_roleplay_chat_response(
+        response = await scheduler.submit(
+            generate_roleplay_chat_response,
             user_message=req.message,
             topic=req.user_role,  # Use user_role as topic for now
-            test_history=req.test_history
+            test_history=req.test_history,
+            priority=INTERACTIVE,
+            user_id=req.user_id,
+            store_id=req.store_id,
         )
         
         return {
             "status": "success",
             "response": response
         }
+    except AdmissionError as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI chat error: {str(e)}")
 
@@ -46,16 +65,22 @@ async def roleplay_feedback(req: RoleplayFeedbackRequest):
     try:
         from ..llm_helper import generate_roleplay_scenario_feedback
         
-        feedback = generate_roleplay_scenario_feedback(
+        feedback = await scheduler.submit(
+            generate_roleplay_scenario_feedback,
             scenario=req.scenario_id,
             user_response=req.user_response,
-            test_history=req.scenario_history
+            test_history=req.scenario_history,
+            priority=INTERACTIVE,
+            user_id=req.user_id,
+            store_id=req.store_id,
         )
         
         return {
             "status": "success",
             "feedback": feedback
         }
+    except AdmissionError as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Feedback generation error: {str(e)}")
 
@@ -64,25 +89,36 @@ async def generate_ai_test_questions(
     category: str,
     difficulty: str,
     count: int,
-    user_role: str
+    user_role: str,
+    user_id: Optional[str] = None,
+    store_id: Optional[str] = None,
 ):
     """
     Generate AI test questions for skill assessment
     """
     try:
-        # For now, return a simple response
-        # In a full implementation, this would call the LLM to generate questions
+        questions = await scheduler.submit(
+            generate_ai_questions,
+            topic=category,
+            difficulty=difficulty,
+            count=count,
+            priority=BATCH,
+            user_id=user_id,
+            store_id=store_id,
+        )
         return {
             "status": "success",
-            "questions": [
-                {
-                    "id": 1,
-                    "question": f"Test question for {category} at {difficulty} level",
-                    "type": "scenario",
-                    "difficulty": difficulty,
-                    "category": category
-                }
-            ]
+            "questions": questions
         }
+    except AdmissionError as e:
+        raise _admission_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Question generation error: {str(e)}")
+
+@router.get("/scheduler-stats")
+async def get_scheduler_stats():
+    """
+    Queue depths, in-flight calls and queue wait percentiles per priority class,
+    plus call count, token usage and latency of the LLM transport
+    """
+    return {**scheduler.stats(), "llm": llm_transport.stats()}
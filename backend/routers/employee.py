@@ -1,8 +1,22 @@
 from fastapi import APIRouter
-from backend.db import get_random_quizzes,get_quiz_info,save_quiz_attempt
+from pydantic import BaseModel
+from typing import List, Optional
+from backend.db import get_random_quizzes,get_quiz_info,save_quiz_attempt,save_quiz_attempts,is_correct_answer
+from backend.quiz_bundle import bundle_for, grade_synced_attempts
 
 router = APIRouter(prefix="/employee", tags=["employee"])
 
+class SyncedAttempt(BaseModel):
+    attempt_id: str  # generated on the store client, makes uploads idempotent
+    user_id: str
+    quiz_id: str
+    answer: str
+    answered_at: Optional[str] = None
+
+class SyncRequest(BaseModel):
+    store_id: Optional[str] = None
+    attempts: List[SyncedAttempt]
+
 @router.get("/quizzes/{user_id}")
 async def get_quizzes_for_user(user_id: str):
     # Later: lookup assigned quizzes from DB
@@ -17,10 +31,28 @@ async def submit_quiz(payload: dict):
     answer = payload["answer"]
 
     quiz = get_quiz_info(quiz_id)
-    correct = (answer.strip().lower() == quiz["answer"].strip().lower())
+    correct = is_correct_answer(answer, quiz["answer"])
 
     save_quiz_attempt(user_id, quiz_id, answer, correct)
 
     return {"correct": correct, "score": 1 if correct else 0}
 
+@router.get("/bundle")
+async def get_quiz_bundle(store_id: Optional[str] = None, topic: Optional[str] = None, since: Optional[str] = None):
+    """
+    Offline quiz bundle for a store. Pass the version already held as `since`
+    to receive only changed and removed questions. Bundles are per topic;
+    store_id only labels the response.
+    """
+    return bundle_for(store_id=store_id, topic=topic, since=since)
+
+@router.post("/sync")
+async def sync_attempts(req: SyncRequest):
+    """
+    Upload attempts buffered offline. Safe to retry: attempts already stored
+    under the same attempt_id are skipped.
+    """
+    rows, results, rejected = grade_synced_attempts([a.dict() for a in req.attempts])
+    save_quiz_attempts(rows)
+    return {"accepted": list(results), "rejected": rejected, "results": results}
 
@@ -1,11 +1,34 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from backend.db import get_all_submissions,get_user_report
+from backend.analytics_snapshot import BUCKETS, ROLLUP_DIMENSIONS, export_snapshot, merge_rollups, pivot, rollup_since
+from backend import cache
+from starlette.concurrency import run_in_threadpool
+from datetime import date
+from typing import Optional
+import os
+import threading
+import time
 
 
 router = APIRouter(prefix="/manager", tags=["manager"])
 
+# Heatmaps are served from this worker's daily rollup. A background thread
+# refreshes it every REFRESH_SECONDS when new attempts landed; requests never
+# export. A refresh that adds rows bumps "heatmap", which invalidates cached
+# pivots and their ETags.
+REFRESH_SECONDS = float(os.getenv("LERNA_HEATMAP_REFRESH_SECONDS", "30"))
+_rollup_lock = threading.Lock()
+# The rollup, the newest answered_at folded into it and the attempts version it covers
+_rollup = {"table": None, "newest": None, "version": None}
+_refresher = None
+
 @router.get("/progress")
 async def get_all_employee_progress():
+    """
+    Raw attempts still inside the retention window (LERNA_RETENTION_DAYS,
+    180 by default). Older attempts are compacted by backend/retention.py:
+    their history is in /manager/heatmap and in user reports.
+    """
     return get_all_submissions()
 
 @router.get("/report/{user_id}")
@@ -15,4 +38,77 @@ async def get_user_learning_report(user_id: str):
     if existing:
         return existing
     return None
-    
+
+def _refresh_rollup():
+    # Fold just the attempts exported since the last refresh into the rollup.
+    # export_snapshot serialises across workers.
+    with _rollup_lock:
+        at = cache.version("attempts")
+        if _rollup["table"] is not None and at == _rollup["version"]:
+            return _rollup["table"]
+        export_snapshot()
+        increment, newest = rollup_since(_rollup["newest"])
+        rollup = increment if _rollup["table"] is None else merge_rollups(_rollup["table"], increment)
+        _rollup.update(table=rollup, newest=newest, version=at)
+        if increment.num_rows:
+            cache.bump("heatmap")
+        return rollup
+
+def _refresh_loop():
+    while True:
+        time.sleep(REFRESH_SECONDS)
+        try:
+            _refresh_rollup()
+        except Exception as e:
+            print(f"Heatmap rollup refresh failed: {e}")
+
+def _current_rollup():
+    global _refresher
+    if _refresher is None:
+        with _rollup_lock:
+            if _refresher is None:
+                _refresher = threading.Thread(target=_refresh_loop, name="heatmap-refresh", daemon=True)
+                _refresher.start()
+    rollup = _rollup["table"]
+    # Only the first heatmap in a worker builds the rollup on the request path
+    return rollup if rollup is not None else _refresh_rollup()
+
+def _heatmap(dimensions, bucket, start, end, store_id, topic):
+    return pivot(
+        _current_rollup(),
+        dimensions,
+        bucket=None if bucket == "none" else bucket,
+        start=start,
+        end=end,
+        filters={"store_id": store_id, "sop_topic": topic},
+    )
+
+@router.get("/heatmap")
+async def get_cohort_heatmap(
+    dims: str = "store_id,sop_topic",
+    bucket: str = "week",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    store_id: Optional[str] = None,
+    topic: Optional[str] = None,
+):
+    """
+    Accuracy pivot over dims (comma separated, from store_id / sop_topic /
+    difficulty) and a time bucket (day / week / month / none).
+    """
+    dimensions = list(dict.fromkeys(d.strip() for d in dims.split(",") if d.strip()))
+    unknown = [d for d in dimensions if d not in ROLLUP_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown dimensions: {', '.join(unknown)}")
+    if bucket != "none" and bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Unknown bucket: {bucket}")
+
+    key = ("heatmap", tuple(dimensions), bucket, start, end, store_id, topic)
+    at = cache.version("heatmap")
+    result = cache.get("heatmap", key)
+    if result is None:
+        # Pivoting (and the first rollup build) is blocking; keep it off the event loop
+        result = await run_in_threadpool(_heatmap, dimensions, bucket, start, end, store_id, topic)
+        # Pivots follow this worker's rollup, so they stay in this worker
+        cache.put("heatmap", key, result, at_version=at, shared=False)
+    return result
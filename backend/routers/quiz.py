@@ -1,8 +1,11 @@
 from ssl import Options
 from fastapi import APIRouter, Body
 from pydantic import BaseModel
-from backend.llm_helper import generate_quiz_from_sop
 from backend.db import save_quiz_to_db,grade_quiz_attempt,get_random_quizzes,get_quiz_info
+from backend.llm_helper import generate_quiz_from_sop
+from backend.llm_scheduler import scheduler, AdmissionError, BATCH
+from backend import llm_transport
+from fastapi import HTTPException
 from typing import List, Optional
 
 router = APIRouter(prefix="/quiz", tags=["quiz"])
@@ -28,7 +31,12 @@ class QuizSaveRequest(BaseModel):
 @router.post("/generate")
 async def generate_quiz(req: QuizRequest):
 
-    # return generate_quiz_from_sop(sop_text)
+    if llm_transport.enabled():
+        try:
+            return await scheduler.submit(generate_quiz_from_sop, req.sop_text, priority=BATCH)
+        except AdmissionError as e:
+            raise HTTPException(status_code=503, detail=str(e),
+                                headers={"Retry-After": str(max(1, round(e.retry_after)))})
     quiz = [
   {
     "sop_topic": "Corporate Culture",
@@ -217,6 +217,7 @@ const RoleplayTraining = ({ user }) => {
         body: JSON.stringify({
           message: userInput,
           user_role: user.role,
+          user_id: user.id,
           conversation_history: conversation,
           test_history: testHistory.slice(0, 5) // Send last 5 sessions
         })
@@ -499,6 +500,7 @@ const AIRolePlayTraining = ({ user }) => {
           scenario_id: selectedScenario,
           user_response: conversation.map(msg => `${msg.role}: ${msg.content}`).join('\n'),
           user_role: user.role,
+          user_id: user.id,
           scenario_history: []
         })
       });
@@ -535,6 +537,7 @@ const AIRolePlayTraining = ({ user }) => {
         body: JSON.stringify({
           message: userInput,
           user_role: user.role,
+          user_id: user.id,
           conversation_history: conversation,
           test_history: []
         })
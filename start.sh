@@ -1,2 +1,13 @@
-uvicorn backend.main:app --port 8000 &
-streamlit run frontend/app.py
\ No newline at end of file
+# WORKERS>1 runs the API under gunicorn with uvicorn workers; caches are
+# shared between workers through backend/cache.py (local SQLite file).
+# Each worker runs its own LLM scheduler: LLM_CONCURRENCY is split evenly
+# between them (so keep it >= WORKERS) and the per-user/per-store token
+# buckets live in the shared cache file. A worker does not see the other
+# workers' queues, so the interactive reserve and load shedding are per worker.
+export WORKERS=${WORKERS:-1}
+if [ "$WORKERS" -gt 1 ]; then
+  gunicorn backend.main:app -k uvicorn.workers.UvicornWorker -w "$WORKERS" -b 127.0.0.1:8000 &
+else
+  uvicorn backend.main:app --port 8000 &
+fi
+streamlit run frontend/app.py